@@ -1,10 +1,129 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from main import Payer
+import asyncio
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from main import (DEFAULT_YEAR, MARRIED_STATUSES, RESULT_CACHE, RESULT_FIELDS, STATUS_CODES, Payer, available_years,
+                  calculate_batch, calculate_rows, compare_filing_statuses, get_tax_year, parse_batch_row, tax_curve)
+from assets import AssetCache
+from backends import SessionLease, SessionLeaseMiddleware, SocketBackend
+from grossup import gross_up, gross_up_batch
+from payroll import paycheck_schedule
+from metrics import MetricsMiddleware, Registry, timed
+from sessions import SessionStore
+from simulate import DEFAULT_QUANTILES, job_specs, shutdown_pool, simulate
+from storage import SessionDatabase
+
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "X-Session-ID"
+
+registry = Registry()
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by method, route and status",
+                                 ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram("http_request_duration_seconds", "HTTP request latency by method and route",
+                                  ("method", "route"))
+HTTP_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests currently being served")
+CALCULATOR_LATENCY = registry.histogram("calculator_duration_seconds", "Time spent in Payer calculations",
+                                        ("function",))
+
+
+class InstrumentedPayer(Payer):
+    """Payer whose calculation hot paths report to the calculator_duration_seconds histogram"""
+    calculate = timed(CALCULATOR_LATENCY, ("calculate",))(Payer.calculate)
+    calculate_fica = timed(CALCULATOR_LATENCY, ("calculate_fica",))(Payer.calculate_fica)
+    calculate_income_tax = timed(CALCULATOR_LATENCY, ("calculate_income_tax",))(Payer.calculate_income_tax)
+
+
+# Sessions are persisted to SQLite when TAXCALC_DB names a database file
+database = SessionDatabase(os.environ["TAXCALC_DB"]) if os.environ.get("TAXCALC_DB") else None
+sessions = SessionStore(
+    max_sessions=int(os.environ.get("TAXCALC_MAX_SESSIONS", 10000)),
+    ttl=float(os.environ.get("TAXCALC_SESSION_TTL", 3600)),
+    payer_factory=InstrumentedPayer,
+    database=database
+)
+# Web UI files served from memory; TAXCALC_DEV=1 reloads them when they change on disk
+assets = AssetCache(os.path.dirname(os.path.abspath(__file__)), reload=os.environ.get("TAXCALC_DEV") == "1")
+
+# Several workers share session state through a state server when TAXCALC_STATE_SOCKET names its socket
+state_backend = SocketBackend(os.environ["TAXCALC_STATE_SOCKET"]) if os.environ.get("TAXCALC_STATE_SOCKET") else None
 
-payer = Payer()
 app = FastAPI()
+if state_backend is not None:
+    app.add_middleware(SessionLeaseMiddleware)
+app.add_middleware(MetricsMiddleware, requests=HTTP_REQUESTS, latency=HTTP_LATENCY, in_flight=HTTP_IN_FLIGHT)
+
+
+@app.on_event("shutdown")
+def flush_sessions():
+    if database is not None:
+        database.close()
+    shutdown_pool()
+
+# Rows computed per vectorized pass by /calculate_stream
+STREAM_CHUNK_ROWS = 1024
+# Longest input line /calculate_stream accepts, in characters; longer lines are reported as row errors
+MAX_LINE_LENGTH = 64 * 1024
+# Worker processes of the pool shared by all /simulate requests (default: CPU count)
+SIMULATION_WORKERS = int(os.environ.get("TAXCALC_SIM_WORKERS", 0)) or None
+
+
+def get_session_id(request: Request, response: Response):
+    # Browsers carry the session in a cookie; API clients may send a header instead
+    session_id = request.cookies.get(SESSION_COOKIE) or request.headers.get(SESSION_HEADER)
+    if not session_id:
+        session_id = sessions.new_id()
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return session_id
+
+
+async def get_payer(request: Request, session_id: str = Depends(get_session_id)):
+    if state_backend is None:
+        return sessions.get(session_id)
+    # Requests that may change the session hold its lock until SessionLeaseMiddleware saves it
+    lease = SessionLease(state_backend, sessions, session_id)
+    payer = await lease.acquire(lock=request.method not in ("GET", "HEAD"))
+    request.state.session_lease = lease
+    return payer
+
+
+def get_year(year: Optional[int] = Query(None)):
+    """Optional ?year= parameter; 422 if there are no parameters for that tax year"""
+    if year is not None:
+        try:
+            get_tax_year(year)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    return year
+
+
+def payer_state(payer):
+    """Full snapshot of a payer, as returned by /state and every mutating endpoint"""
+    return {
+        "status": payer.status,
+        "jobs": [job.as_tuple() for job in payer.jobs],
+        "deductions": payer.deduct,
+        "refundable_credits": payer.rcredit,
+        "non_refundable_credits": payer.nrcredit,
+        "rules": payer.rules,
+        "standard_deduction_added": payer.standard_deduction_added,
+        "year": payer.year,
+        "version": payer.version
+    }
+
+
+def state_etag(state):
+    # Content hash, so it matches across workers and rehydration and never for different state
+    text = json.dumps(jsonable_encoder(state), sort_keys=True, separators=(",", ":"))
+    return f'"{hashlib.blake2b(text.encode(), digest_size=16).hexdigest()}"'
 
 
 # Request models for POST endpoints
@@ -21,6 +140,16 @@ class RemoveRequest(BaseModel):
 class StatusRequest(BaseModel):
     status: str
 
+class YearRequest(BaseModel):
+    year: int
+
+class RuleRequest(BaseModel):
+    name: str
+    units: float = 1
+
+class RuleNameRequest(BaseModel):
+    name: str
+
 class DeductionRequest(BaseModel):
     desc: str
     amount: float
@@ -29,146 +158,536 @@ class CreditRequest(BaseModel):
     desc: str
     amount: float
 
+class OperationsRequest(BaseModel):
+    # Mutations in the same {"op": name, ...fields} form as the /ws channel
+    operations: List[Dict[str, Any]]
+
+class SpouseRequest(BaseModel):
+    jobs: List[JobRequest] = []
+    deductions: List[DeductionRequest] = []
+    rcredits: List[CreditRequest] = []
+    nrcredits: List[CreditRequest] = []
+    rules: Dict[str, float] = {}  # Rule name -> units claimed, e.g. {"child_tax_credit": 2}
+
+class CompareRequest(BaseModel):
+    spouses: List[SpouseRequest] = Field(..., min_length=2, max_length=2)
+    statuses: List[str] = list(MARRIED_STATUSES)
+    year: Optional[int] = None
+    exact: bool = False
+
+class SimulationRequest(BaseModel):
+    # Job specs with distributions (see simulate.py); defaults to the session's fixed jobs
+    jobs: Optional[List[Dict[str, Any]]] = None
+    scenarios: int = Field(100000, ge=1, le=10000000)
+    seed: int = 0
+    quantiles: List[float] = list(DEFAULT_QUANTILES)
+    year: Optional[int] = None
+
+class BatchRequest(BaseModel):
+    # Columnar inputs, one entry per taxpayer
+    status: List[str]
+    gross_income: List[float]
+    deductions: Optional[List[float]] = None
+    nrcredits: Optional[List[float]] = None
+    rcredits: Optional[List[float]] = None
+    year: Optional[int] = None  # Applies to every row
+    exact: bool = False  # Integer-cents engine
+    rules: Optional[Dict[str, List[float]]] = None  # Rule name -> units claimed per row
+
+class GrossUpBatchRequest(BaseModel):
+    # Columnar inputs, one entry per target
+    target_net: List[float]
+    status: List[Optional[str]]
+    deductions: Optional[List[float]] = None
+    nrcredits: Optional[List[float]] = None
+    rcredits: Optional[List[float]] = None
+    year: Optional[int] = None  # Applies to every row
+
 
 @app.get("/")
-async def get_ui():
-    return FileResponse("index.html")
+async def get_ui(request: Request):
+    return assets.serve(assets.index, request)
 
 
 @app.get("/styles.css")
-async def get_styles():
-    return FileResponse("styles.css")
+async def get_styles(request: Request):
+    return assets.serve(assets.styles, request)
 
 
 @app.get("/script.js")
-async def get_script():
-    return FileResponse("script.js")
+async def get_script(request: Request):
+    return assets.serve(assets.script, request)
 
 
 @app.get("/period_to_number")
-async def get_period_to_number(period: str = Query(...)):
+async def get_period_to_number(period: str = Query(...), payer: Payer = Depends(get_payer)):
     return payer.period_to_number(period)
 
 
-@app.post("/add_job")
-async def get_add_job(request: JobRequest):
+def add_job_from_request(payer, request):
     # Convert periods back to period string for the main.py method
     period_map = {1: 'A', 12: 'M', 24: 'S', 26: 'B', 52: 'W'}
     period = period_map.get(request.periods, 'A')  # Default to 'A' if not found
-    
-    result = payer.add_job(request.desc, bool(request.salary), request.amount, period, request.hours)
-    return {"success": result}
+    return payer.add_job(request.desc, bool(request.salary), request.amount, period, request.hours)
+
+
+# Mutations that can be sent as {"op": name, ...fields}: name -> (request model, apply function)
+OPERATIONS = {
+    "add_job": (JobRequest, add_job_from_request),
+    "remove_job": (RemoveRequest, lambda payer, request: payer.remove_job(request.index)),
+    "set_status": (StatusRequest, lambda payer, request: payer.set_status(request.status)),
+    "set_year": (YearRequest, lambda payer, request: payer.set_year(request.year)),
+    "add_deduct": (DeductionRequest, lambda payer, request: payer.add_deduct(request.desc, request.amount) or True),
+    "remove_deduct": (RemoveRequest, lambda payer, request: payer.remove_deduct(request.index)),
+    "add_rcredit": (CreditRequest, lambda payer, request: payer.add_rcredit(request.desc, request.amount) or True),
+    "remove_rcredit": (RemoveRequest, lambda payer, request: payer.remove_rcredit(request.index)),
+    "add_nrcredit": (CreditRequest, lambda payer, request: payer.add_nrcredit(request.desc, request.amount) or True),
+    "remove_nrcredit": (RemoveRequest, lambda payer, request: payer.remove_nrcredit(request.index)),
+    "add_rule": (RuleRequest, lambda payer, request: payer.add_rule(request.name, request.units)),
+    "remove_rule": (RuleNameRequest, lambda payer, request: payer.remove_rule(request.name))
+}
+
+
+def parse_operation(op):
+    """Validate an operation dict, returning (apply function, request model); raises ValueError"""
+    if not isinstance(op, dict) or not isinstance(op.get("op"), str) or op["op"] not in OPERATIONS:
+        raise ValueError(f"unknown operation: {op.get('op') if isinstance(op, dict) else op!r}")
+    model, apply = OPERATIONS[op["op"]]
+    fields = {key: value for key, value in op.items() if key != "op"}
+    return apply, model(**fields)  # pydantic's ValidationError is a ValueError
+
+
+@app.post("/add_job")
+async def get_add_job(request: JobRequest, payer: Payer = Depends(get_payer)):
+    result = add_job_from_request(payer, request)
+    return {"success": result, "state": payer_state(payer)}
 
 
 @app.post("/remove_job")
-async def get_remove_job(request: RemoveRequest):
+async def get_remove_job(request: RemoveRequest, payer: Payer = Depends(get_payer)):
     result = payer.remove_job(request.index)
-    return {"success": result}
+    return {"success": result, "state": payer_state(payer)}
 
 
 @app.post("/set_status")
-async def get_set_status(request: StatusRequest):
+async def get_set_status(request: StatusRequest, payer: Payer = Depends(get_payer)):
     result = payer.set_status(request.status)
-    return {"success": result}
+    return {"success": result, "state": payer_state(payer)}
+
+
+@app.post("/set_year")
+async def get_set_year(request: YearRequest, payer: Payer = Depends(get_payer)):
+    result = payer.set_year(request.year)
+    return {"success": result, "state": payer_state(payer)}
 
 
 @app.post("/add_deduct")
-async def get_add_deduct(request: DeductionRequest):
+async def get_add_deduct(request: DeductionRequest, payer: Payer = Depends(get_payer)):
     payer.add_deduct(request.desc, request.amount)
-    return {"success": True}
+    return {"success": True, "state": payer_state(payer)}
 
 
 @app.post("/remove_deduct")
-async def get_remove_deduct(request: RemoveRequest):
+async def get_remove_deduct(request: RemoveRequest, payer: Payer = Depends(get_payer)):
     result = payer.remove_deduct(request.index)
-    return {"success": result}
+    return {"success": result, "state": payer_state(payer)}
 
 
 @app.post("/add_rcredit")
-async def get_add_rcredit(request: CreditRequest):
+async def get_add_rcredit(request: CreditRequest, payer: Payer = Depends(get_payer)):
     payer.add_rcredit(request.desc, request.amount)
-    return {"success": True}
+    return {"success": True, "state": payer_state(payer)}
 
 
 @app.post("/remove_rcredit")
-async def get_remove_rcredit(request: RemoveRequest):
+async def get_remove_rcredit(request: RemoveRequest, payer: Payer = Depends(get_payer)):
     result = payer.remove_rcredit(request.index)
-    return {"success": result}
+    return {"success": result, "state": payer_state(payer)}
 
 
 @app.post("/add_nrcredit")
-async def get_add_nrcredit(request: CreditRequest):
+async def get_add_nrcredit(request: CreditRequest, payer: Payer = Depends(get_payer)):
     payer.add_nrcredit(request.desc, request.amount)
-    return {"success": True}
+    return {"success": True, "state": payer_state(payer)}
 
 
 @app.post("/remove_nrcredit")
-async def get_remove_nrcredit(request: RemoveRequest):
+async def get_remove_nrcredit(request: RemoveRequest, payer: Payer = Depends(get_payer)):
     result = payer.remove_nrcredit(request.index)
-    return {"success": result}
+    return {"success": result, "state": payer_state(payer)}
+
+
+@app.post("/add_rule")
+async def get_add_rule(request: RuleRequest, payer: Payer = Depends(get_payer)):
+    result = payer.add_rule(request.name, request.units)
+    return {"success": result, "state": payer_state(payer)}
+
+
+@app.post("/remove_rule")
+async def get_remove_rule(request: RuleNameRequest, payer: Payer = Depends(get_payer)):
+    result = payer.remove_rule(request.name)
+    return {"success": result, "state": payer_state(payer)}
+
+
+@app.post("/apply")
+async def apply_operations(request: OperationsRequest, payer: Payer = Depends(get_payer)):
+    """Apply a list of operations all or nothing, returning the final state and calculation"""
+    errors = []
+    parsed = []
+    for index, op in enumerate(request.operations):
+        try:
+            parsed.append(parse_operation(op))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    # Work on a copy so a failing operation leaves the session untouched
+    draft = payer.copy()
+    for index, (apply, op) in enumerate(parsed):
+        if not apply(draft, op):
+            raise HTTPException(status_code=422, detail=[{"index": index, "error": "operation failed"}])
+    if parsed:
+        payer.commit(draft)
+    return {"success": True, "state": payer_state(payer), "result": payer.calculate()}
 
 
 @app.get("/calculate_fica")
-async def get_calculate_fica(gross_income: float = Query(...)):
-    return payer.calculate_fica(gross_income)
+async def get_calculate_fica(gross_income: float = Query(...), year: Optional[int] = Depends(get_year),
+                             payer: Payer = Depends(get_payer)):
+    return payer.calculate_fica(gross_income, year)
 
 
 @app.get("/calculate_tax")
-async def get_calculate_tax(gross_income: float = Query(...)):
-    return payer.calculate_tax(gross_income)
+async def get_calculate_tax(gross_income: float = Query(...), year: Optional[int] = Depends(get_year),
+                            payer: Payer = Depends(get_payer)):
+    return payer.calculate_income_tax(gross_income, year)
 
 
 @app.get("/calculate")
-async def get_calculate():
-    result = payer.calculate()
+async def get_calculate(year: Optional[int] = Depends(get_year), exact: bool = Query(False),
+                        payer: Payer = Depends(get_payer)):
+    result = payer.calculate(year, exact)
     return result
 
 
+@app.get("/tax_curve")
+async def get_tax_curve(start: float = Query(0.0, ge=0), stop: float = Query(..., gt=0),
+                        steps: int = Query(101, ge=2, le=10001), year: Optional[int] = Depends(get_year),
+                        payer: Payer = Depends(get_payer)):
+    if stop <= start:
+        raise HTTPException(status_code=422, detail="stop must be greater than start")
+    return tax_curve(payer.status, payer.deduct_total, payer.nrcredit_total, payer.rcredit_total,
+                     start, stop, steps, payer.year if year is None else year, tuple(sorted(payer.rules.items())))
+
+
+@app.get("/gross_up")
+async def get_gross_up(target_net: float = Query(...), year: Optional[int] = Depends(get_year),
+                       payer: Payer = Depends(get_payer)):
+    # Uses the current filing status, deductions and credits; jobs are ignored
+    gross_income = gross_up(target_net, payer.status, payer.deduct_total, payer.nrcredit_total,
+                            payer.rcredit_total, payer.year if year is None else year, tuple(sorted(payer.rules.items())))
+    return {"target_net": target_net, "gross_income": gross_income}
+
+
+@app.get("/paychecks")
+async def get_paychecks(year: Optional[int] = Depends(get_year), payer: Payer = Depends(get_payer)):
+    # Every paycheck of every job in pay date order, with FICA and income tax withheld
+    return {"paychecks": [paycheck._asdict() for paycheck in paycheck_schedule(payer, year)]}
+
+
+def spouse_payer(request, year=None):
+    """Standalone Payer holding one spouse's items"""
+    payer = Payer()
+    if year is not None:
+        payer.set_year(year)
+    for index, job in enumerate(request.jobs):
+        if not add_job_from_request(payer, job):
+            raise HTTPException(status_code=422, detail=f"invalid job {index}")
+    for item in request.deductions:
+        payer.add_deduct(item.desc, item.amount)
+    for item in request.rcredits:
+        payer.add_rcredit(item.desc, item.amount)
+    for item in request.nrcredits:
+        payer.add_nrcredit(item.desc, item.amount)
+    for name, units in request.rules.items():
+        if units and not payer.add_rule(name, units):  # Zero units means not claimed
+            raise HTTPException(status_code=422, detail=f"invalid rule {name}")
+    return payer
+
+
+@app.post("/compare_status")
+async def post_compare_status(request: CompareRequest):
+    # Stateless: the household comes in the body, so the session is left alone
+    year = get_year(request.year)
+    first, second = (spouse_payer(spouse, year) for spouse in request.spouses)
+    try:
+        ranking = compare_filing_statuses(first, second, request.statuses, year, request.exact)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    best = next((comparison["status"] for comparison in ranking if comparison["eligible"]), None)
+    return {"best": best, "ranking": ranking}
+
+
+@app.post("/simulate")
+def post_simulate(request: SimulationRequest, payer: Payer = Depends(get_payer)):
+    # A plain def runs in the threadpool, so long simulations do not block the event loop
+    if any(not 0 <= q <= 1 for q in request.quantiles):
+        raise HTTPException(status_code=422, detail="quantiles must be between 0 and 1")
+    year = get_year(request.year)
+    try:
+        return simulate(job_specs(payer) if request.jobs is None else request.jobs, payer.status,
+                        payer.deduct_total, payer.nrcredit_total, payer.rcredit_total, request.scenarios,
+                        request.seed, request.quantiles, workers=SIMULATION_WORKERS,
+                        year=payer.year if year is None else year, rules=payer.rules)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def check_statuses(statuses):
+    """Raise 422 for the first filing status that is neither known nor unset (None)"""
+    for i, status in enumerate(statuses):
+        if status is not None and status not in STATUS_CODES:
+            raise HTTPException(status_code=422, detail=f"invalid filing status at row {i}: {status!r}")
+
+
+@app.post("/gross_up_batch")
+async def get_gross_up_batch(request: GrossUpBatchRequest):
+    size = len(request.target_net)
+    columns = {}
+    for name in ('status', 'deductions', 'nrcredits', 'rcredits'):
+        column = getattr(request, name)
+        if column is None:
+            continue
+        if len(column) != size:
+            raise HTTPException(status_code=422, detail=f"{name} must have {size} entries")
+        columns[name] = column
+    check_statuses(request.status)
+    year = get_year(request.year)
+    return {"gross_income": gross_up_batch(request.target_net, year=year, **columns).tolist()}
+
+
+@app.post("/calculate_batch")
+async def get_calculate_batch(request: BatchRequest):
+    size = len(request.status)
+    check_statuses(request.status)
+    columns = {}
+    for name in ('gross_income', 'deductions', 'nrcredits', 'rcredits'):
+        column = getattr(request, name)
+        if column is None:
+            continue
+        if len(column) != size:
+            raise HTTPException(status_code=422, detail=f"{name} must have {size} entries")
+        columns[name] = column
+    for name, units in (request.rules or {}).items():
+        if len(units) != size:
+            raise HTTPException(status_code=422, detail=f"rule {name} must have {size} entries")
+    result = calculate_batch(request.status, year=get_year(request.year), exact=request.exact, rules=request.rules,
+                             **columns)
+    return {key: values.tolist() for key, values in result.items()}
+
+
+@app.get("/state")
+async def get_state(request: Request, response: Response, payer: Payer = Depends(get_payer)):
+    state = payer_state(payer)
+    etag = state_etag(state)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    if request.headers.get("If-None-Match") == etag:
+        # Keep the headers set on the injected response, including a new session cookie
+        return Response(status_code=304, headers=dict(response.headers))
+    return state
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body is produced while the request body is still being read.
+
+    Starlette's StreamingResponse listens on receive() for a disconnect, which would
+    swallow the request body chunks, so this leaves receive() to the request reader.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(request):
+    """Decode the request body incrementally and yield complete lines.
+
+    A line longer than MAX_LINE_LENGTH is skipped and yields None instead, so memory
+    stays bounded whatever the body looks like.
+    """
+    # Invalid UTF-8 becomes U+FFFD, so a bad byte fails only its own row (as invalid JSON or a bad value)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    async def texts():
+        async for chunk in request.stream():
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    pending, length = [], 0  # Pieces of the current line
+    skipping = False  # Inside a line that was already too long
+    async for text in texts():
+        *lines, rest = text.split("\n")
+        for piece in lines:
+            if not skipping:
+                yield None if length + len(piece) > MAX_LINE_LENGTH else ("".join(pending) + piece).rstrip("\r")
+            pending, length, skipping = [], 0, False
+        if rest and not skipping:
+            pending.append(rest)
+            length += len(rest)
+            if length > MAX_LINE_LENGTH:
+                yield None
+                pending, length, skipping = [], 0, True
+    if pending:
+        yield "".join(pending).rstrip("\r")
+
+
+async def iter_rows(request, fmt):
+    """Yield (row number, mapping of BATCH_FIELDS or ValueError) from a CSV or NDJSON body"""
+    header = None
+    number = 0
+    async for line in iter_lines(request):
+        if line is None:
+            yield number, ValueError(f"line longer than {MAX_LINE_LENGTH} characters")
+            number += 1
+            continue
+        if not line.strip():
+            continue
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row = dict(zip(header, values))
+        else:
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = ValueError(f"invalid JSON: {e}")
+        yield number, row
+        number += 1
+
+
+def format_results(fmt, results, write_header=False):
+    """Serialize (row number, result tuple or error message) pairs"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if write_header:
+            writer.writerow(("row",) + RESULT_FIELDS + ("error",))
+        for number, result in results:
+            if isinstance(result, str):
+                writer.writerow((number,) + ("",) * len(RESULT_FIELDS) + (result,))
+            else:
+                writer.writerow((number,) + result + ("",))
+        return buffer.getvalue()
+
+    lines = []
+    for number, result in results:
+        if isinstance(result, str):
+            lines.append(json.dumps({"row": number, "error": result}))
+        else:
+            record = dict(zip(RESULT_FIELDS, result))
+            record["row"] = number
+            lines.append(json.dumps(record))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+async def stream_results(request, fmt, year=None):
+    """Parse, compute and emit the body in fixed-size chunks"""
+    if fmt == "csv":
+        yield format_results(fmt, [], write_header=True)
+    numbers, rows, errors = [], [], []
+
+    def flush():
+        results = dict(errors)
+        results.update(zip(numbers, calculate_rows(rows, year)))
+        chunk = format_results(fmt, sorted(results.items()))
+        numbers.clear()
+        rows.clear()
+        errors.clear()
+        return chunk
+
+    async for number, row in iter_rows(request, fmt):
+        try:
+            if isinstance(row, Exception):
+                raise row
+            if not isinstance(row, dict):
+                raise ValueError("row must be an object")
+            rows.append(parse_batch_row(row))
+            numbers.append(number)
+        except (TypeError, ValueError) as e:
+            errors.append((number, str(e)))
+        if len(rows) + len(errors) >= STREAM_CHUNK_ROWS:
+            yield flush()
+    if rows or errors:
+        yield flush()
+
+
+@app.post("/calculate_stream")
+async def get_calculate_stream(request: Request, year: Optional[int] = Depends(get_year)):
+    # One household per row with columns BATCH_FIELDS; CSV needs a header line
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        return BodyStreamingResponse(stream_results(request, "csv", year), media_type="text/csv")
+    return BodyStreamingResponse(stream_results(request, "ndjson", year), media_type="application/x-ndjson")
+
+
 @app.get("/get_filing_status")
-async def get_filing_status():
+async def get_filing_status(payer: Payer = Depends(get_payer)):
     return {"status": payer.status}
 
 
 @app.get("/get_jobs")
-async def get_jobs():
-    return {"jobs": payer.jobs}
+async def get_jobs(payer: Payer = Depends(get_payer)):
+    return {"jobs": [job.as_tuple() for job in payer.jobs]}
 
 
 @app.get("/get_deductions")
-async def get_deductions():
+async def get_deductions(payer: Payer = Depends(get_payer)):
     return {"deductions": payer.deduct}
 
 
 @app.get("/get_refundable_credits")
-async def get_refundable_credits():
+async def get_refundable_credits(payer: Payer = Depends(get_payer)):
     return {"refundable_credits": payer.rcredit}
 
 
 @app.get("/get_non_refundable_credits")
-async def get_non_refundable_credits():
+async def get_non_refundable_credits(payer: Payer = Depends(get_payer)):
     return {"non_refundable_credits": payer.nrcredit}
 
 
 @app.get("/get_standard_deduction_added")
-async def get_standard_deduction_added():
+async def get_standard_deduction_added(payer: Payer = Depends(get_payer)):
     return {"standard_deduction_added": payer.standard_deduction_added}
 
 
 @app.get("/get_standard_deduction_amount")
-async def get_standard_deduction_amount():
-    if payer.status == 'J':
-        amount = 30000
-    elif payer.status == 'H':
-        amount = 22500
-    elif payer.status == 'S':
-        amount = 15000
-    else:  # Single
-        amount = 15000
+async def get_standard_deduction_amount(year: Optional[int] = Depends(get_year),
+                                        payer: Payer = Depends(get_payer)):
+    amount = get_tax_year(payer.year if year is None else year).standard_deduction(payer.status)
     return {"amount": amount}
 
 
+@app.get("/get_rules")
+async def get_rules(year: Optional[int] = Depends(get_year), payer: Payer = Depends(get_payer)):
+    # Phase-out rules that can be claimed in a tax year, with their breakpoints
+    rules = get_tax_year(payer.year if year is None else year).rules
+    return {"rules": {name: {"kind": rule.kind, "description": rule.description,
+                             "points": {status: list(zip(xs, ys)) for status, (xs, ys, _) in rule.tables.items()}}
+                      for name, rule in rules.items()}}
+
+
+@app.get("/get_tax_years")
+async def get_tax_years():
+    return {"years": available_years(), "default": DEFAULT_YEAR}
+
+
 @app.get("/get_period_multiplier")
-async def get_period_multiplier(period: str = Query(...)):
+async def get_period_multiplier(period: str = Query(...), payer: Payer = Depends(get_payer)):
     multiplier = payer.period_to_number(period)
     return {"multiplier": multiplier}
 
@@ -183,3 +702,120 @@ async def get_status_names():
             'H': 'Head of Household'
         }
     }
+
+
+async def load_payer(session_id):
+    """Current payer of a session, brought up to date from the state backend if there is one"""
+    if state_backend is None:
+        return sessions.get(session_id)
+    lease = SessionLease(state_backend, sessions, session_id)
+    payer = await lease.acquire(lock=False)
+    await lease.release()
+    return payer
+
+
+def diff(old, new):
+    """Top-level keys of new whose values differ from old"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+@app.websocket("/ws")
+async def live_updates(websocket: WebSocket):
+    """Live recalculation channel.
+
+    Clients send operations such as {"op": "add_job", "desc": ..., "salary": 1, ...} with
+    the same fields as the matching POST endpoints. After each burst of operations the
+    server replies with only the parts of the state and calculate() result that changed.
+    Operations that arrive while a burst is being processed are coalesced into one update.
+    """
+    session_id = (websocket.cookies.get(SESSION_COOKIE) or websocket.headers.get(SESSION_HEADER)
+                  or websocket.query_params.get("session") or sessions.new_id())
+    await websocket.accept()
+    payer = await load_payer(session_id)
+    state = jsonable_encoder(payer_state(payer))
+    result = payer.calculate()
+    await websocket.send_json({"session": session_id, "state": state, "result": result})
+
+    inbox = asyncio.Queue()
+
+    async def read():
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    await inbox.put(json.loads(text))
+                except ValueError:
+                    await inbox.put(text)  # Reported back as an unknown operation
+        except WebSocketDisconnect:
+            pass
+        except Exception:
+            await websocket.close(code=1003)  # Unsupported data, e.g. a binary frame
+        finally:
+            inbox.put_nowait(None)  # Any receive error also ends the session loop
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            burst = [await inbox.get()]
+            while not inbox.empty():
+                burst.append(inbox.get_nowait())
+
+            errors = []
+            closed = False
+            lease = None
+            if state_backend is not None:
+                lease = SessionLease(state_backend, sessions, session_id)
+                payer = await lease.acquire()
+            try:
+                for op in burst:
+                    if op is None:
+                        closed = True
+                        break
+                    try:
+                        apply, request = parse_operation(op)
+                        if not apply(payer, request):
+                            errors.append({"op": op, "error": "operation failed"})
+                    except ValueError as e:
+                        errors.append({"op": op, "error": str(e)})
+            except BaseException:
+                if lease is not None:
+                    await lease.release(save=False)
+                raise
+            if lease is not None and not await lease.release():
+                errors.append({"error": "session was changed by another request; retry"})
+            if closed:
+                break
+
+            payer = await load_payer(session_id)  # Refresh the last access time, or reload after a lost race
+            new_state = jsonable_encoder(payer_state(payer))
+            new_result = payer.calculate()
+            update = {"version": payer.version, "state": diff(state, new_state), "result": diff(result, new_result)}
+            if errors:
+                update["errors"] = errors
+            state, result = new_state, new_result
+            await websocket.send_json(update)
+    finally:
+        reader.cancel()
+
+
+@app.get("/session_stats")
+async def get_session_stats():
+    stats = sessions.stats()
+    if database is not None:
+        stats["database"] = database.stats()
+    return stats
+
+
+@app.get("/cache_stats")
+async def get_cache_stats():
+    return RESULT_CACHE.stats()
+
+
+@app.get("/metrics")
+async def get_metrics():
+    lines = [registry.render()]
+    for key, value in sessions.stats().items():
+        lines.append(f"# TYPE taxcalc_sessions_{key} gauge\ntaxcalc_sessions_{key} {value}\n")
+    for key, value in RESULT_CACHE.stats().items():
+        lines.append(f"# TYPE taxcalc_result_cache_{key} gauge\ntaxcalc_result_cache_{key} {value}\n")
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
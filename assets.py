@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # Listed in requirements.txt; without it (e.g. a bare dev environment) only gzip is served
+    brotli = None
+
+# Versioned asset URLs never change content, so browsers may keep them for a year
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+class StaticAsset:
+    """A file held in memory with precompressed variants and content-hash ETags"""
+
+    def __init__(self, path, media_type, rewrite=None):
+        self.path = path
+        self.media_type = media_type
+        self.rewrite = rewrite  # Optional function applied to the file text before caching
+        self.load()
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            body = f.read()
+        self.mtime = os.stat(self.path).st_mtime
+        if self.rewrite is not None:
+            body = self.rewrite(body.decode("utf-8")).encode("utf-8")
+        self.version = hashlib.sha256(body).hexdigest()[:16]
+        # Encoding -> (body, ETag); each encoding gets its own strong ETag
+        self.variants = {None: (body, f'"{self.version}"')}
+        self.variants["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{self.version}-gz"')
+        if brotli is not None:
+            self.variants["br"] = (brotli.compress(body), f'"{self.version}-br"')
+        self.etags = {etag for _, etag in self.variants.values()}
+
+    def reload_if_changed(self):
+        try:
+            if os.stat(self.path).st_mtime != self.mtime:
+                self.load()
+                return True
+        except OSError:
+            pass
+        return False
+
+    def choose_encoding(self, accept_encoding):
+        accepted = {token.split(";")[0].strip() for token in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+    def response(self, request, cache_control):
+        encoding = self.choose_encoding(request.headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or
+                              self.etags & {tag.strip() for tag in if_none_match.split(",")}):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+class AssetCache:
+    """The web UI files, loaded once and served from memory.
+
+    index.html references styles.css and script.js by content hash, so those two can be
+    cached forever while the page itself is revalidated with its ETag on every load.
+    With reload enabled, files are checked for changes on each request (development mode).
+    """
+
+    def __init__(self, directory, reload=False):
+        self.reload = reload
+        self.styles = StaticAsset(os.path.join(directory, "styles.css"), "text/css")
+        self.script = StaticAsset(os.path.join(directory, "script.js"), "application/javascript")
+        self.index = StaticAsset(os.path.join(directory, "index.html"), "text/html", self.versioned_links)
+
+    def versioned_links(self, html):
+        html = html.replace('href="styles.css"', f'href="styles.css?v={self.styles.version}"')
+        return html.replace('src="script.js"', f'src="script.js?v={self.script.version}"')
+
+    def check_reload(self):
+        if not self.reload:
+            return
+        changed = self.styles.reload_if_changed()
+        changed = self.script.reload_if_changed() or changed
+        if changed:
+            self.index.load()  # Pick up the new asset versions
+        else:
+            self.index.reload_if_changed()
+
+    def serve(self, asset, request):
+        self.check_reload()
+        if asset is self.index:
+            return asset.response(request, REVALIDATE_CACHE)
+        # Only a URL carrying the current version is safe to cache forever
+        versioned = request.query_params.get("v") == asset.version
+        return asset.response(request, IMMUTABLE_CACHE if versioned else REVALIDATE_CACHE)
@@ -0,0 +1,276 @@
+"""Shared session state for running several uvicorn workers.
+
+Each worker keeps its own SessionStore as a cache; a state backend holds the
+authoritative snapshot of every session. A request that may change a session takes
+that session's lock in the backend, brings its local payer up to date, runs, and saves
+the new snapshot before the response is sent. Saves are compare-and-swap on the
+snapshot version, so a worker whose lock was lost (e.g. after a backend restart) can
+never overwrite a newer state; the request then fails with 409 and the client retries.
+
+Backends implement four coroutines: load, lock, unlock and save (see SessionBackend).
+SocketBackend talks to a StateServer process over a Unix socket:
+
+    python backends.py serve /tmp/taxcalc.sock
+    TAXCALC_STATE_SOCKET=/tmp/taxcalc.sock uvicorn app:app --workers 4
+"""
+import abc
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import sys
+import weakref
+from collections import OrderedDict
+
+STATE_KEY = "session_lease"  # Where a request's SessionLease is kept in the ASGI scope state
+
+
+class SessionBackend(abc.ABC):
+    """Interface of a shared state backend; every method is a coroutine"""
+
+    @abc.abstractmethod
+    async def load(self, session_id):
+        """Latest snapshot (Payer.to_dict()) of a session, or None"""
+
+    @abc.abstractmethod
+    async def lock(self, session_id):
+        """Wait for the session's lock and return a token for unlock"""
+
+    @abc.abstractmethod
+    async def unlock(self, session_id, token):
+        """Release a lock taken by lock"""
+
+    @abc.abstractmethod
+    async def save(self, session_id, data, expected_version):
+        """Store data if the stored version is still expected_version (0 if none); return success"""
+
+
+class SocketBackend(SessionBackend):
+    """Client of a StateServer, with a pool of connections per event loop"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pools = weakref.WeakKeyDictionary()  # event loop -> idle connections
+
+    async def call(self, **request):
+        pool = self.pools.setdefault(asyncio.get_running_loop(), [])
+        reader, writer = pool.pop() if pool else await asyncio.open_unix_connection(self.path)
+        try:
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("state server closed the connection")
+        except BaseException:
+            writer.close()
+            raise
+        pool.append((reader, writer))
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def load(self, session_id):
+        return (await self.call(op="load", id=session_id))["data"]
+
+    async def lock(self, session_id):
+        return (await self.call(op="lock", id=session_id))["token"]
+
+    async def unlock(self, session_id, token):
+        await self.call(op="unlock", id=session_id, token=token)
+
+    async def save(self, session_id, data, expected_version):
+        return (await self.call(op="save", id=session_id, data=data, expected=expected_version))["ok"]
+
+
+class StateServer:
+    """Holds session snapshots and per-session locks for SocketBackend clients.
+
+    Locks belong to the connection that took them and are released if it disconnects,
+    so a crashed worker cannot leave a session locked.
+    """
+
+    def __init__(self, path, max_sessions=100000):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session id -> snapshot
+        self.locks = {}  # session id -> [asyncio.Lock, holders + waiters], dropped when unused
+        self.owners = {}  # session id -> (token, ids locked by the owning connection)
+        self.conflicts = 0
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, self.path)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        held = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.dispatch(json.loads(line), held)
+                except (KeyError, TypeError, ValueError) as e:
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for session_id in list(held):
+                self.release(session_id)
+            writer.close()
+
+    def release(self, session_id):
+        _, held = self.owners.pop(session_id)
+        held.discard(session_id)
+        self.locks[session_id][0].release()
+        self.unuse(session_id)
+
+    def unuse(self, session_id):
+        entry = self.locks[session_id]
+        entry[1] -= 1
+        if not entry[1]:
+            del self.locks[session_id]
+
+    async def dispatch(self, request, held):
+        op, session_id = request["op"], request.get("id")
+        if op == "load":
+            data = self.sessions.get(session_id)
+            if data is not None:
+                self.sessions.move_to_end(session_id)
+            return {"data": data}
+        if op == "lock":
+            entry = self.locks.setdefault(session_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                await entry[0].acquire()
+            except BaseException:
+                self.unuse(session_id)
+                raise
+            token = secrets.token_hex(8)
+            self.owners[session_id] = (token, held)
+            held.add(session_id)
+            return {"token": token}
+        if op == "unlock":
+            owner = self.owners.get(session_id)
+            if owner is None or owner[0] != request["token"]:
+                return {"ok": False}
+            self.release(session_id)
+            return {"ok": True}
+        if op == "save":
+            current = self.sessions.get(session_id)
+            if (current["version"] if current else 0) != request["expected"]:
+                self.conflicts += 1
+                return {"ok": False}
+            self.sessions[session_id] = request["data"]
+            self.sessions.move_to_end(session_id)
+            self.evict()
+            return {"ok": True}
+        if op == "stats":
+            return {"sessions": len(self.sessions), "locked": len(self.owners), "locks": len(self.locks),
+                    "conflicts": self.conflicts}
+        raise ValueError(f"unknown op: {op!r}")
+
+    def evict(self):
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+
+class SessionLease:
+    """One request's hold on a session: lock, bring the local payer up to date, save, unlock"""
+
+    def __init__(self, backend, sessions, session_id):
+        self.backend = backend
+        self.sessions = sessions
+        self.session_id = session_id
+        self.token = None
+        self.payer = None
+        self.base_version = 0  # Version stored in the backend when the lease was taken
+
+    async def acquire(self, lock=True):
+        if lock:
+            self.token = await self.backend.lock(self.session_id)
+        try:
+            data = await self.backend.load(self.session_id)
+        except BaseException:
+            await self.release(save=False)
+            raise
+        self.payer = self.sessions.sync(self.session_id, data)
+        self.base_version = data["version"] if data else 0
+        return self.payer
+
+    async def release(self, save=True):
+        """Save the payer if it changed and unlock; False if another worker saved first"""
+        ok = True
+        try:
+            if self.payer is not None and (not save or self.payer.version != self.base_version):
+                ok = save and await self.backend.save(self.session_id, self.payer.to_dict(), self.base_version)
+                if not ok:
+                    self.sessions.remove(self.session_id)  # The local copy diverged; reload next time
+        finally:
+            if self.token is not None:
+                token, self.token = self.token, None
+                await self.backend.unlock(self.session_id, token)
+        return ok
+
+
+class SessionLeaseMiddleware:
+    """Pure ASGI middleware releasing a request's SessionLease before its response starts.
+
+    Saving before the response is sent means a client that gets a response always sees
+    that change from every worker. If the save loses a version race, the response is
+    replaced by 409 Conflict.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        conflict = False
+
+        async def send_after_release(message):
+            nonlocal conflict
+            if message["type"] == "http.response.start":
+                lease = state.pop(STATE_KEY, None)
+                if lease is not None and not await lease.release():
+                    conflict = True
+                    await send({"type": "http.response.start", "status": 409,
+                                "headers": [(b"content-type", b"application/json")]})
+                    await send({"type": "http.response.body",
+                                "body": b'{"detail":"session was changed by another request; retry"}'})
+                    return
+            if not conflict:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_release)
+        finally:
+            lease = state.pop(STATE_KEY, None)
+            if lease is not None:  # Failed before responding: drop any partial change
+                await lease.release(save=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared session state server for multi-worker deployments.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run a state server on a Unix socket")
+    serve.add_argument("path", help="socket path")
+    serve.add_argument("--max-sessions", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    asyncio.run(StateServer(args.path, args.max_sessions).serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Benchmarks for the calculator core and the HTTP layer.
+
+Run all benchmarks and save the results:
+    python bench.py --output bench.json
+
+Compare against an earlier run and fail on a regression of more than 10%:
+    python bench.py --compare bench.json --threshold 0.10
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from main import Payer, calculate_batch, calculate_batch_cents, to_cents_array
+from payroll import paycheck_schedule, paycheck_schedule_batch
+from simulate import simulate
+
+
+def time_call(func, repeat=5, min_time=0.05):
+    """Seconds per call of func: the loop count is scaled until one repeat takes min_time"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'loops': number,
+        'repeat': repeat
+    }
+
+
+def make_payer(jobs=1, deductions=1, credits=1, status='U'):
+    payer = Payer()
+    payer.set_status(status)
+    for i in range(jobs):
+        if i % 2:
+            payer.add_job(f'Hourly {i}', False, 25.0 + i % 10, 'B', 80)
+        else:
+            payer.add_job(f'Salary {i}', True, 4000.0 + i, 'M')
+    for i in range(deductions):
+        payer.add_deduct(f'Deduction {i}', 100.0 + i)
+    for i in range(credits):
+        payer.add_nrcredit(f'Credit {i}', 10.0 + i)
+        payer.add_rcredit(f'Refundable {i}', 5.0 + i)
+    return payer
+
+
+def core_benchmarks():
+    """Name -> zero-argument callable for every Payer method benchmark"""
+    benchmarks = {}
+    payer = make_payer()
+    incomes = [0.0, 30000.0, 120000.0, 450000.0, 900000.0]
+
+    def income_tax():
+        for income in incomes:
+            payer.calculate_income_tax(income)
+
+    def fica():
+        for income in incomes:
+            payer.calculate_fica(income)
+
+    benchmarks['core.calculate_income_tax[x5]'] = income_tax
+    benchmarks['core.calculate_fica[x5]'] = fica
+
+    for size in (1, 1000):
+        sized = make_payer(jobs=size, deductions=size, credits=size)
+
+        def calculate_shared(sized=sized):
+            sized._result = None  # Miss the per-payer cache, hit the shared one
+            sized.calculate()
+
+        benchmarks[f'core.calculate_cold[n={size}]'] = sized._calculate
+        benchmarks[f'core.calculate_cents_cold[n={size}]'] = sized._calculate_cents
+        benchmarks[f'core.calculate_shared[n={size}]'] = calculate_shared
+        benchmarks[f'core.calculate_cached[n={size}]'] = sized.calculate
+        benchmarks[f'core.calculate_exact_cached[n={size}]'] = lambda sized=sized: sized.calculate(exact=True)
+        benchmarks[f'core.build_payer[n={size}]'] = lambda size=size: make_payer(size, size, size)
+
+        def add_remove_job(sized=sized):
+            sized.add_job('Extra', True, 1000.0, 'M')
+            sized.remove_job(len(sized.jobs) - 1)
+
+        benchmarks[f'core.add_remove_job[n={size}]'] = add_remove_job
+
+    rng = np.random.default_rng(0)
+    for rows in (1000, 100000):
+        status = rng.choice(['U', 'J', 'S', 'H'], rows)
+        gross_income = rng.uniform(0, 500000, rows)
+        deductions = rng.uniform(0, 20000, rows)
+        benchmarks[f'core.calculate_batch[rows={rows}]'] = (
+            lambda s=status, g=gross_income, d=deductions: calculate_batch(s, g, d))
+        benchmarks[f'core.calculate_batch_cents[rows={rows}]'] = (
+            lambda s=status, g=to_cents_array(gross_income), d=to_cents_array(deductions):
+            calculate_batch_cents(s, g, d))
+
+        def weekly_paychecks(s=status, g=gross_income, d=deductions):
+            for _ in paycheck_schedule_batch(s, g / 52, 52, d):
+                pass
+
+        benchmarks[f'core.paycheck_schedule_batch[rows={rows},periods=52]'] = weekly_paychecks
+    benchmarks['core.paycheck_schedule[jobs=2]'] = lambda: list(paycheck_schedule(make_payer(jobs=2)))
+
+    uncertain_jobs = [
+        {'salary': False, 'amount': 32.5, 'period': 'B', 'hours': {'dist': 'normal', 'mean': 80, 'sd': 8},
+         'raise': {'dist': 'uniform', 'low': 0, 'high': 0.05}},
+        {'salary': True, 'amount': 3000, 'period': 'M', 'bonus': {'dist': 'triangular', 'low': 0, 'mode': 1000,
+                                                                     'high': 5000}}
+    ]
+    benchmarks['core.simulate[scenarios=100000]'] = (
+        lambda: simulate(uncertain_jobs, 'J', 1000.0, scenarios=100000, workers=1))
+    return benchmarks
+
+
+async def asgi_request(app, method, url, body=None, headers=()):
+    """Send one request straight to an ASGI app and return (status, headers, body)"""
+    parts = urlsplit(url)
+    payload = json.dumps(body).encode() if body is not None else b''
+    raw_headers = [(b'host', b'bench'), (b'content-length', str(len(payload)).encode())]
+    if body is not None:
+        raw_headers.append((b'content-type', b'application/json'))
+    raw_headers.extend((name.lower().encode(), value.encode()) for name, value in headers)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': parts.path,
+        'raw_path': parts.path.encode(),
+        'query_string': parts.query.encode(),
+        'root_path': '',
+        'headers': raw_headers,
+        'client': ('127.0.0.1', 0),
+        'server': ('bench', 80)
+    }
+    messages = [{'type': 'http.request', 'body': payload, 'more_body': False}]
+    disconnected = asyncio.Event()
+    response = {'status': None, 'headers': [], 'body': []}
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+            response['headers'] = message.get('headers', [])
+        elif message['type'] == 'http.response.body':
+            response['body'].append(message.get('body', b''))
+            if not message.get('more_body'):
+                disconnected.set()
+
+    await app(scope, receive, send)
+    return response['status'], response['headers'], b''.join(response['body'])
+
+
+def http_benchmarks():
+    """Name -> zero-argument callable for in-process FastAPI endpoint benchmarks"""
+    from app import app  # Imported lazily so core benchmarks run without the web stack
+
+    loop = asyncio.new_event_loop()
+    session = [('X-Session-ID', 'bench-session')]
+
+    def call(method, url, body=None):
+        status, _, _ = loop.run_until_complete(asgi_request(app, method, url, body, session))
+        if status >= 400:
+            raise RuntimeError(f'{method} {url} returned {status}')
+
+    call('POST', '/set_status', {'status': 'U'})
+    call('POST', '/add_job', {'desc': 'Salary', 'salary': 1, 'amount': 85000, 'periods': 1, 'hours': 0})
+    call('POST', '/add_deduct', {'desc': 'Deduction', 'amount': 2000})
+
+    def add_remove_job():
+        call('POST', '/add_job', {'desc': 'Extra', 'salary': 1, 'amount': 1000, 'periods': 12, 'hours': 0})
+        call('POST', '/remove_job', {'index': 1})
+
+    def add_remove_deduct():
+        call('POST', '/add_deduct', {'desc': 'Extra', 'amount': 100})
+        call('POST', '/remove_deduct', {'index': 1})
+
+    return {
+        'http.calculate': lambda: call('GET', '/calculate'),
+        'http.state': lambda: call('GET', '/state'),
+        'http.set_status': lambda: call('POST', '/set_status', {'status': 'U'}),
+        'http.add_remove_job': add_remove_job,
+        'http.add_remove_deduct': add_remove_deduct
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names of benchmarks whose median is more than threshold slower than the baseline"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = result['median'] / before['median'] - 1
+        marker = 'REGRESSION' if change > threshold else ''
+        print(f"{name:45} {before['median'] * 1e6:12.2f}us -> {result['median'] * 1e6:12.2f}us "
+              f"{change:+8.1%} {marker}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the tax calculator.')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='allowed slowdown versus the baseline (default: 0.10)')
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this')
+    parser.add_argument('--no-http', action='store_true', help='skip the FastAPI benchmarks')
+    args = parser.parse_args(argv)
+
+    benchmarks = core_benchmarks()
+    if not args.no_http:
+        benchmarks.update(http_benchmarks())
+
+    results = {}
+    for name, func in benchmarks.items():
+        if args.filter not in name:
+            continue
+        results[name] = time_call(func)
+        print(f"{name:45} {results[name]['median'] * 1e6:12.2f}us")
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'benchmarks': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['benchmarks']
+        print()
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Gross-up solver: the annual salary that leaves a target take-home pay.
+
+Take-home pay (gross income minus FICA and income tax, plus refundable credits) is a
+piecewise-linear, strictly increasing function of gross income. Its kinks are known in
+closed form: the Social Security wage base, the additional Medicare surtax threshold,
+every bracket threshold shifted by the deductions, the breakpoints of any phase-out
+rules, and the point where income tax reaches the non-refundable credits. Evaluating
+the pipeline at those kinks once gives an exact table that is inverted by linear
+interpolation, with no iterative search.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from main import (_status_codes, calculate_batch, calculate_income_tax_batch, get_tax_year, register_cache,
+                  rule_amounts_batch)
+
+
+def _crossings(x, y, levels):
+    """Points where the piecewise-linear function through (x, y) crosses each level"""
+    found = []
+    for x0, x1, y0, y1 in zip(x, x[1:], y, y[1:]):
+        for level in levels:
+            if (y0 - level) * (y1 - level) < 0:
+                found.append(x0 + (level - y0) * (x1 - x0) / (y1 - y0))
+    return found
+
+
+@lru_cache(maxsize=1024)
+def net_schedule(status, deductions=0.0, nrcredits=0.0, rcredits=0.0, year=None, rules=()):
+    """(gross incomes, take-home pay) at every kink of the take-home pay function.
+
+    rules is a tuple of (name, units) pairs. Gross income is the AGI the rules see.
+    """
+    tax_year = get_tax_year(year)
+    claimed = [(tax_year.rules[name], units) for name, units in rules if name in tax_year.rules]
+    points = {0.0, float(tax_year.social_security_limit), float(tax_year.surtax_threshold(status))}
+    points.update(x for rule, _ in claimed for x in rule.breakpoints(status))
+
+    def evaluate(gross_income):
+        """Income tax before non-refundable credits, and those credits"""
+        codes = _status_codes(np.full(gross_income.shape, status, dtype=object))
+        amounts = rule_amounts_batch(codes, gross_income, rules, year)
+        taxable_income = gross_income - tax_year.standard_deduction(status) - deductions - sum(amounts['deduct'])
+        income_tax = calculate_income_tax_batch(codes, np.maximum(taxable_income, 0.0), year)
+        return taxable_income, income_tax, nrcredits + sum(amounts['nrcredit'])
+
+    table = tax_year.tables.get(status)
+    if table is not None:
+        # Taxable income is linear between deduction rule breakpoints, so each bracket
+        # threshold is crossed at a point found by interpolation
+        deduct_rules = [(rule, units) for rule, units in claimed if rule.kind == 'deduct']
+        grid = np.array(sorted({0.0} | {x for rule, _ in deduct_rules for x in rule.breakpoints(status)}))
+        # Far enough out that taxable income is past the top threshold
+        most_deducted = deductions + sum(max(rule.table(status)[1]) * units for rule, units in deduct_rules)
+        grid = np.append(grid, grid[-1] + tax_year.standard_deduction(status) + most_deducted + table.lowers[-1]
+                         + 1000000.0)
+        points.update(_crossings(grid, evaluate(grid)[0], table.lowers))
+        # Tax and credits are both linear between the kinks so far; add where they meet
+        x = np.array(sorted(point for point in points if point >= 0))
+        x = np.append(x, x[-1] + 1000000.0)
+        _, income_tax, credits = evaluate(x)
+        points.update(_crossings(x, np.asarray(income_tax - credits, dtype=float), (0.0,)))
+
+    gross_income = np.array(sorted(point for point in points if point >= 0))
+    # One more point past the last kink fixes the slope of the final segment
+    gross_income = np.append(gross_income, gross_income[-1] + 1000000.0)
+    total_tax = calculate_batch(np.full(gross_income.shape, status, dtype=object), gross_income,
+                                deductions, nrcredits, rcredits, year, rules=rules)['total_tax']
+    return gross_income, gross_income - total_tax
+
+
+register_cache(net_schedule.cache_clear)
+
+
+def _invert(target_net, gross_income, net):
+    target_net = np.asarray(target_net, dtype=float)
+    result = np.interp(target_net, net, gross_income)
+    # Extend the final segment linearly beyond the table
+    slope = (gross_income[-1] - gross_income[-2]) / (net[-1] - net[-2])
+    beyond = target_net > net[-1]
+    result = np.where(beyond, gross_income[-1] + (target_net - net[-1]) * slope, result)
+    # Take-home pay never drops below its value at zero income
+    return np.where(target_net <= net[0], 0.0, result)
+
+
+def gross_up(target_net, status, deductions=0.0, nrcredits=0.0, rcredits=0.0, year=None, rules=()):
+    """Annual gross income whose take-home pay is target_net"""
+    gross_income, net = net_schedule(status, float(deductions), float(nrcredits), float(rcredits), year,
+                                     tuple(rules))
+    return float(_invert(target_net, gross_income, net))
+
+
+def gross_up_batch(target_net, status, deductions=0.0, nrcredits=0.0, rcredits=0.0, year=None, rules=()):
+    """Vectorized gross_up over columnar inputs; scalars and rules apply to every row"""
+    rules = tuple(rules)
+    if all(np.ndim(value) == 0 for value in (status, deductions, nrcredits, rcredits)):
+        # A single profile needs one schedule and no grouping
+        gross_income, net = net_schedule(status, float(deductions), float(nrcredits), float(rcredits), year, rules)
+        return _invert(target_net, gross_income, net)
+    target_net, status, deductions, nrcredits, rcredits = np.broadcast_arrays(
+        np.asarray(target_net, dtype=float), np.asarray(status, dtype=object),
+        np.asarray(deductions, dtype=float), np.asarray(nrcredits, dtype=float), np.asarray(rcredits, dtype=float))
+    result = np.empty(target_net.shape)
+    # Rows sharing a profile share one schedule and one interpolation pass
+    profiles = {}
+    for index, profile in enumerate(zip(status.ravel(), deductions.ravel(), nrcredits.ravel(), rcredits.ravel())):
+        profiles.setdefault(profile, []).append(index)
+    flat_targets = target_net.ravel()
+    flat_result = result.reshape(-1)
+    for (row_status, row_deductions, row_nrcredits, row_rcredits), indices in profiles.items():
+        gross_income, net = net_schedule(row_status, float(row_deductions), float(row_nrcredits),
+                                         float(row_rcredits), year, rules)
+        flat_result[indices] = _invert(flat_targets[indices], gross_income, net)
+    return result
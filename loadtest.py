@@ -0,0 +1,308 @@
+"""Load generator replaying web UI sessions against the API.
+
+Every virtual session makes the same calls as script.js does for a new visitor: load
+the state, set a filing status, add a job, add deductions and calculate (with the
+/get_status_names refresh the page makes after every state change). Amounts vary per
+session but are seeded, so runs are repeatable. A recorded trace can be replayed
+instead with --trace: a JSON list of {"method": ..., "url": ..., "body": ...} steps,
+run once per session.
+
+Run in-process (no server, no network) or against a running server:
+    python loadtest.py --concurrency 1,8,32,128 --duration 10
+    python loadtest.py --url http://127.0.0.1:8000 --concurrency 64 --rate 200
+
+Without --rate each of the --concurrency users starts a new session as soon as its last
+one ends (closed loop). With --rate sessions arrive as a Poisson process at that many per
+second and at most --concurrency run at once (open loop); latency then includes the
+time a session waited for a free slot. The report is JSON with requests/sec, latency
+percentiles and error rates, overall and per endpoint, for each concurrency level.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from bench import asgi_request
+
+PERCENTILES = (50, 95, 99)
+
+
+def session_trace(rng):
+    """Steps of one web UI visit as (method, url, body), with amounts drawn from rng"""
+    status = rng.choice('UUUJJH')
+    period, periods = rng.choice((('A', 1), ('M', 12), ('B', 26), ('W', 52)))
+    salary = rng.random() < 0.7
+    amount = round(rng.uniform(30000, 150000) / periods, 2) if salary else round(rng.uniform(15, 60), 2)
+    steps = [
+        ('GET', '/state', None),
+        ('GET', '/get_status_names', None),
+        ('POST', '/set_status', {'status': status}),
+        ('GET', '/get_status_names', None),
+        ('GET', f'/get_period_multiplier?period={period}', None),
+        ('POST', '/add_job', {'desc': 'Job', 'salary': int(salary), 'amount': amount, 'periods': periods,
+                              'hours': 0 if salary else rng.choice((20, 30, 40))}),
+        ('GET', '/get_status_names', None)
+    ]
+    for i in range(rng.randint(1, 3)):
+        steps.append(('POST', '/add_deduct', {'desc': f'Deduction {i + 1}', 'amount': round(rng.uniform(100, 5000), 2)}))
+        steps.append(('GET', '/get_status_names', None))
+    steps.append(('GET', '/calculate', None))
+    return steps
+
+
+def load_trace(path):
+    """Steps of a recorded session from a JSON file"""
+    with open(path) as f:
+        return [(step['method'].upper(), step['url'], step.get('body')) for step in json.load(f)]
+
+
+def failed(status, body):
+    # script.js treats {"success": false} as an error as well as a non-2xx status
+    return status >= 400 or b'"success":false' in body
+
+
+class InProcessClient:
+    """Calls the ASGI app directly"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, url, body, headers):
+        status, _, content = await asgi_request(self.app, method, url, body, headers)
+        return status, content
+
+    async def close(self):
+        pass
+
+
+class HttpClient:
+    """Minimal HTTP/1.1 client keeping one connection alive per virtual user"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.reader = self.writer = None
+
+    async def request(self, method, url, body, headers):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        lines = [f'{method} {self.prefix}{url} HTTP/1.1', f'Host: {self.host}:{self.port}',
+                 f'Content-Length: {len(payload)}']
+        if body is not None:
+            lines.append('Content-Type: application/json')
+        lines.extend(f'{name}: {value}' for name, value in headers)
+        try:
+            self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + payload)
+            await self.writer.drain()
+            return await self.read_response()
+        except BaseException:
+            await self.close()
+            raise
+
+    async def read_response(self):
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError('server closed the connection')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            content = b''.join(chunk[:-2] for chunk in chunks)
+        else:
+            content = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class Recorder:
+    """Latency and outcome of every request, keyed by endpoint path"""
+
+    def __init__(self):
+        self.latencies = {}  # path -> [seconds]
+        self.errors = {}  # path -> count
+        self.statuses = {}  # status code (or exception name) -> count
+
+    def record(self, url, latency, outcome, error):
+        path = url.split('?', 1)[0]
+        self.latencies.setdefault(path, []).append(latency)
+        if error:
+            self.errors[path] = self.errors.get(path, 0) + 1
+        self.statuses[outcome] = self.statuses.get(outcome, 0) + 1
+
+    def summary(self, latencies, errors):
+        latencies = np.asarray(latencies) * 1000.0
+        count = int(latencies.size)
+        return {
+            'requests': count,
+            'errors': errors,
+            'error_rate': errors / count if count else 0.0,
+            'latency_ms': {
+                'mean': float(latencies.mean()) if count else 0.0,
+                **{f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)
+                                                      if count else [0.0] * len(PERCENTILES))},
+                'max': float(latencies.max()) if count else 0.0
+            }
+        }
+
+
+async def run_session(client, steps, session_id, recorder, started):
+    """Replay one session; the first request's latency counts from started (its arrival)"""
+    headers = [('X-Session-ID', session_id)]
+    for method, url, body in steps:
+        try:
+            status, content = await client.request(method, url, body, headers)
+            outcome, error = status, failed(status, content)
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            outcome, error = type(e).__name__, True
+        now = time.perf_counter()
+        recorder.record(url, now - started, outcome, error)
+        started = now
+
+
+async def run_level(make_client, concurrency, duration, sessions, rate, trace, seed):
+    """Run one concurrency level and return its report"""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    clients = [make_client() for _ in range(concurrency)]
+    idle = asyncio.Queue()
+    for client in clients:
+        idle.put_nowait(client)
+    count = 0
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def more():
+        return (sessions is None or count < sessions) and (deadline is None or time.perf_counter() < deadline)
+
+    def next_session():
+        nonlocal count
+        count += 1
+        return trace or session_trace(random.Random(rng.random())), f'load-{seed}-{concurrency}-{count}'
+
+    async def user():
+        # Closed loop: each user starts its next session when the last one ends
+        client = await idle.get()
+        while more():
+            steps, session_id = next_session()
+            await run_session(client, steps, session_id, recorder, time.perf_counter())
+
+    async def arrival(steps, session_id, arrived):
+        # Open loop: the session waits for a free client, and that wait counts as latency
+        client = await idle.get()
+        try:
+            await run_session(client, steps, session_id, recorder, arrived)
+        finally:
+            idle.put_nowait(client)
+
+    if rate:
+        tasks = []
+        arrival_time = start
+        while True:
+            arrival_time += rng.expovariate(rate)
+            await asyncio.sleep(max(0.0, arrival_time - time.perf_counter()))
+            if not more():
+                break
+            tasks.append(asyncio.create_task(arrival(*next_session(), arrival_time)))
+        await asyncio.gather(*tasks)
+    else:
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    all_latencies = [latency for values in recorder.latencies.values() for latency in values]
+    report = {
+        'concurrency': concurrency,
+        'rate': rate,
+        'sessions': count,
+        'elapsed': elapsed,
+        'rps': len(all_latencies) / elapsed if elapsed else 0.0,
+        **recorder.summary(all_latencies, sum(recorder.errors.values())),
+        'statuses': {str(outcome): n for outcome, n in sorted(recorder.statuses.items(), key=str)},
+        'endpoints': {path: recorder.summary(values, recorder.errors.get(path, 0))
+                      for path, values in sorted(recorder.latencies.items())}
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay web UI sessions against the tax calculator API.')
+    parser.add_argument('--url', help='server to load, e.g. http://127.0.0.1:8000 (default: the app in-process)')
+    parser.add_argument('--concurrency', default='16',
+                        help='concurrent users, or a comma-separated list of levels to run in turn (default: 16)')
+    parser.add_argument('--rate', type=float, help='session arrivals per second (default: closed loop)')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per level (default: 10)')
+    parser.add_argument('--sessions', type=int, help='stop each level after this many sessions')
+    parser.add_argument('--trace', help='JSON file of recorded steps to replay instead of the built-in session')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    try:
+        levels = [int(level) for level in args.concurrency.split(',')]
+    except ValueError:
+        parser.error(f'invalid --concurrency: {args.concurrency!r}')
+    if any(level < 1 for level in levels):
+        parser.error('--concurrency levels must be positive')
+    if args.sessions is None and args.duration <= 0:
+        parser.error('--duration must be positive')
+    if args.rate is not None and args.rate <= 0:
+        parser.error('--rate must be positive')
+    trace = load_trace(args.trace) if args.trace else None
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url)
+    else:
+        from app import app  # Imported lazily so --url runs without the web stack
+
+        def make_client():
+            return InProcessClient(app)
+
+    async def run():
+        return [await run_level(make_client, level, args.duration if args.sessions is None else None,
+                                args.sessions, args.rate, trace, args.seed)
+                for level in levels]
+
+    report = {
+        'target': args.url or 'in-process',
+        'duration': args.duration if args.sessions is None else None,
+        'seed': args.seed,
+        'levels': asyncio.run(run())
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 1 if any(level['errors'] for level in report['levels']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,366 @@
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import sys
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+
+# Pay periods per year: Annual, Monthly, Semi-monthly, Bi-weekly, Weekly
+PERIODS = {'A': 1, 'M': 12, 'S': 24, 'B': 26, 'W': 52}
+
+# Filing status codes used by the batch engine; anything else is treated as "not set"
+STATUS_CODES = {'U': 0, 'J': 1, 'S': 2, 'H': 3}
+UNSET_STATUS = len(STATUS_CODES)
+
+# Tax parameter sets live in tax_years/<year>.json
+TAX_YEARS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tax_years')
+DEFAULT_YEAR = 2025
+
+
+class BracketTable(NamedTuple):
+    """Brackets of one filing status compiled for O(log n) lookup"""
+    lowers: tuple     # Lower threshold of each bracket, ascending
+    rates: tuple      # Marginal rate of each bracket
+    base_tax: tuple   # Cumulative tax owed at each lower threshold
+
+
+def compile_brackets(brackets):
+    """Precompute the cumulative tax at every bracket threshold"""
+    lowers, rates, base_tax = [], [], []
+    tax = 0
+    for lower, upper, rate in brackets:
+        lowers.append(lower)
+        rates.append(rate)
+        base_tax.append(tax)
+        tax += (upper - lower) * rate
+    return BracketTable(tuple(lowers), tuple(rates), tuple(base_tax))
+
+
+# Exact engine: money is integer cents and rates are integer basis points
+RATE_SCALE = 10000
+# Batch lookup keys are status code * CENTS_KEY_SHIFT + taxable cents, so every status
+# shares one sorted table; taxable income must stay below this many cents
+CENTS_KEY_SHIFT = 1 << 52
+
+
+def to_cents(amount):
+    """Dollars to integer cents, rounding half a cent up as the IRS does.
+
+    x * 100 is first rounded to a millionth of a cent, which removes the binary error
+    of amounts like 1.005 (100.49999... cents), so the half-cent test applies to the
+    amount as written in decimal.
+    """
+    return math.floor(round(amount * 100, 6) + 0.5)
+
+
+def _round_cents(amount):
+    """to_cents for computed amounts such as rule results, which have no decimal form to honour"""
+    return math.floor(amount * 100 + 0.5)
+
+
+def to_basis_points(rate):
+    points = round(rate * RATE_SCALE)
+    if abs(points - rate * RATE_SCALE) > 1e-6:
+        raise ValueError(f"rate {rate} is not a whole number of basis points")
+    return points
+
+
+def apply_rate(cents, points):
+    """cents x rate, rounded half up to a whole cent (cents must not be negative)"""
+    return (cents * points + RATE_SCALE // 2) // RATE_SCALE
+
+
+def compile_brackets_cents(brackets):
+    """compile_brackets in cents and basis points; the cumulative tax is exact"""
+    lowers, rates, base_tax = [], [], []
+    tax = 0
+    for lower, upper, rate in brackets:
+        lowers.append(to_cents(lower))
+        rates.append(to_basis_points(rate))
+        base_tax.append(tax)
+        if upper != float('inf'):
+            tax += apply_rate(to_cents(upper) - to_cents(lower), rates[-1])
+    return BracketTable(tuple(lowers), tuple(rates), tuple(base_tax))
+
+
+def _status_table(values, default, dtype=float):
+    """Lookup array indexed by status code, with the default in the unset slot"""
+    table = np.full(UNSET_STATUS + 1, default, dtype=dtype)
+    for status, code in STATUS_CODES.items():
+        table[code] = values[status]
+    return table
+
+
+# What a rule's amount adds to: extra deductions, non-refundable or refundable credits
+RULE_KINDS = ('deduct', 'nrcredit', 'rcredit')
+
+
+class Rule:
+    """A deduction or credit whose amount is a piecewise-linear function of AGI.
+
+    Defined per filing status by (AGI, amount) breakpoints; the amount is interpolated
+    between breakpoints and flat beyond the first and last. Compiled once when its tax
+    year loads: scalar lookups bisect the breakpoints with precomputed slopes, batches
+    use np.interp. Statuses without breakpoints use the single filer's.
+    """
+
+    def __init__(self, name, data):
+        self.name = name
+        self.kind = data['kind']
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"rule {name}: unknown kind {self.kind!r}")
+        self.description = data.get('description', name)
+        self.tables = {}  # status -> (AGI breakpoints, amounts, slopes)
+        for status, points in data['points'].items():
+            xs = tuple(float(x) for x, _ in points)
+            ys = tuple(float(y) for _, y in points)
+            if not xs or any(b <= a for a, b in zip(xs, xs[1:])):
+                raise ValueError(f"rule {name}: breakpoints for {status} must be increasing")
+            slopes = tuple((y1 - y0) / (x1 - x0) for x0, x1, y0, y1 in zip(xs, xs[1:], ys, ys[1:]))
+            self.tables[status] = (xs, ys, slopes)
+        # Breakpoint arrays ordered by status code, the unset status falling back to single
+        self.batch_tables = [(code, np.array(self.table(status)[0]), np.array(self.table(status)[1]))
+                             for status, code in list(STATUS_CODES.items()) + [(None, UNSET_STATUS)]]
+
+    def table(self, status):
+        return self.tables.get(status) or self.tables['U']
+
+    def amount(self, status, agi):
+        xs, ys, slopes = self.table(status)
+        i = bisect_left(xs, agi) - 1
+        if i < 0:
+            return ys[0]
+        if i >= len(slopes):
+            return ys[-1]
+        return ys[i] + (agi - xs[i]) * slopes[i]
+
+    def amount_batch(self, codes, agi):
+        """Vectorized amount over arrays of status codes and AGIs"""
+        agi = np.asarray(agi, dtype=float)
+        codes = np.broadcast_to(codes, agi.shape)
+        amounts = np.empty(agi.shape)
+        for code, xs, ys in self.batch_tables:
+            rows = codes == code
+            if rows.any():
+                amounts[rows] = np.interp(agi[rows], xs, ys)
+        return amounts
+
+    def breakpoints(self, status):
+        return self.table(status)[0]
+
+
+class TaxYear:
+    """Compiled tax parameters of one year, shared by every payer.
+
+    Statuses that are not set fall back to the single filer's standard deduction and
+    surtax threshold, and owe no income tax.
+    """
+
+    def __init__(self, data):
+        self.year = data['year']
+        # Federal income tax brackets: (lower, upper, rate) per filing status
+        self.brackets = {
+            status: tuple((lower, float('inf') if upper is None else upper, rate) for lower, upper, rate in brackets)
+            for status, brackets in data['brackets'].items()
+        }
+        self.tables = {status: compile_brackets(brackets) for status, brackets in self.brackets.items()}
+        self.standard_deductions = data['standard_deductions']
+        # FICA: Social Security wage base, Medicare rates and additional Medicare surtax thresholds
+        self.social_security_limit = data['social_security_limit']
+        self.social_security_rate = data['social_security_rate']
+        self.medicare_rate = data['medicare_rate']
+        self.medicare_surtax_rate = data['medicare_surtax_rate']
+        self.surtax_thresholds = data['surtax_thresholds']
+        # Employers withhold the surtax on wages over this amount whatever the filing status
+        self.surtax_withholding_threshold = data['surtax_withholding_threshold']
+        # Deduction and credit rules with income phase-outs, by name
+        self.rules = {name: Rule(name, rule) for name, rule in data.get('rules', {}).items()}
+
+        # Arrays indexed by status code for the batch engine
+        self.standard_deduction_array = _status_table(self.standard_deductions, self.standard_deductions['U'])
+        self.surtax_threshold_array = _status_table(self.surtax_thresholds, self.surtax_thresholds['U'])
+        self.batch_tables = [
+            (code, np.array(self.tables[status].lowers, dtype=float), np.array(self.tables[status].rates),
+             np.array(self.tables[status].base_tax, dtype=float))
+            for status, code in STATUS_CODES.items()
+        ]
+
+        # The same parameters in cents and basis points for the exact engine
+        self.cent_tables = {status: compile_brackets_cents(brackets) for status, brackets in self.brackets.items()}
+        self.standard_deductions_cents = {status: to_cents(amount) for status, amount in self.standard_deductions.items()}
+        self.surtax_thresholds_cents = {status: to_cents(amount) for status, amount in self.surtax_thresholds.items()}
+        self.social_security_limit_cents = to_cents(self.social_security_limit)
+        self.social_security_points = to_basis_points(self.social_security_rate)
+        self.medicare_points = to_basis_points(self.medicare_rate)
+        self.medicare_surtax_points = to_basis_points(self.medicare_surtax_rate)
+        self.standard_deduction_cents_array = _status_table(
+            self.standard_deductions_cents, self.standard_deductions_cents['U'], np.int64)
+        self.surtax_threshold_cents_array = _status_table(
+            self.surtax_thresholds_cents, self.surtax_thresholds_cents['U'], np.int64)
+        # Every status's brackets in one table ordered by (status code, lower threshold);
+        # the unset status gets a single zero-rate bracket
+        keys, rates, base_tax = [UNSET_STATUS * CENTS_KEY_SHIFT], [0], [0]
+        for status, code in STATUS_CODES.items():
+            table = self.cent_tables[status]
+            keys.extend(code * CENTS_KEY_SHIFT + lower for lower in table.lowers)
+            rates.extend(table.rates)
+            base_tax.extend(table.base_tax)
+        order = np.argsort(keys, kind='stable')
+        self.batch_cent_table = tuple(np.array(values, dtype=np.int64)[order] for values in (keys, rates, base_tax))
+
+    def standard_deduction(self, status):
+        return self.standard_deductions.get(status, self.standard_deductions['U'])  # Default to single
+
+    def surtax_threshold(self, status):
+        return self.surtax_thresholds.get(status, self.surtax_thresholds['U'])  # Default to single
+
+    def standard_deduction_cents(self, status):
+        return self.standard_deductions_cents.get(status, self.standard_deductions_cents['U'])
+
+    def surtax_threshold_cents(self, status):
+        return self.surtax_thresholds_cents.get(status, self.surtax_thresholds_cents['U'])
+
+
+# Loaded tax years, keyed by year; each is read from disk on first use
+TAX_YEARS = {}
+
+
+def available_years():
+    return sorted(int(name[:-5]) for name in os.listdir(TAX_YEARS_DIR)
+                  if name.endswith('.json') and name[:-5].isdigit())
+
+
+def get_tax_year(year=None):
+    """Compiled parameters for a tax year (default: DEFAULT_YEAR); ValueError if unknown"""
+    if year is None:
+        year = DEFAULT_YEAR
+    tax_year = TAX_YEARS.get(year)
+    if tax_year is None:
+        path = os.path.join(TAX_YEARS_DIR, f'{int(year)}.json')
+        if not os.path.exists(path):
+            raise ValueError(f"no tax parameters for {year}")
+        with open(path) as f:
+            tax_year = TAX_YEARS[year] = TaxYear(json.load(f))
+    return tax_year
+
+
+def tax_table(year, status):
+    """Compiled brackets for (year, status), or None if the status is not set"""
+    return get_tax_year(year).tables.get(status)
+
+
+def _fica_cents(tax_year, status, gross_cents):
+    """FICA in integer cents, with the total of the three taxes rounded half up to a cent once"""
+    thresholds = tax_year.surtax_thresholds_cents
+    surtax_threshold = thresholds.get(status, thresholds['U'])
+    fica_tax = (min(gross_cents, tax_year.social_security_limit_cents) * tax_year.social_security_points
+                + gross_cents * tax_year.medicare_points
+                + max(gross_cents - surtax_threshold, 0) * tax_year.medicare_surtax_points)
+    return (fica_tax + RATE_SCALE // 2) // RATE_SCALE
+
+
+def _income_tax_cents(tax_year, status, taxable_cents):
+    """Income tax in integer cents, rounded half up to a cent"""
+    table = tax_year.cent_tables.get(status)
+    if table is None:
+        return 0
+    i = bisect_left(table.lowers, taxable_cents) - 1
+    if i < 0:
+        return 0
+    return table.base_tax[i] + ((taxable_cents - table.lowers[i]) * table.rates[i] + RATE_SCALE // 2) // RATE_SCALE
+
+
+def reload_tax_years():
+    """Forget every loaded year so edited data files are picked up, dropping dependent caches"""
+    TAX_YEARS.clear()
+    invalidate_caches()
+
+
+class ResultCache:
+    """Process-wide LRU cache of calculate() results keyed by a payer's canonical inputs.
+
+    Households with identical inputs share one result no matter which session they
+    belong to. Call clear() whenever the tax tables change.
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.results),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+RESULT_CACHE = ResultCache()
+# Bumped by invalidate_caches(); per-payer results from an older generation are stale
+_CACHE_GENERATION = 0
+
+
+class Job:
+    """A job with its annualized gross income computed once when it is added"""
+    __slots__ = ('desc', 'salary', 'amount', 'periods', 'hours', 'annual')
+
+    def __init__(self, desc, salary, amount, periods, hours=None):
+        self.desc = desc
+        self.salary = salary
+        self.amount = amount  # Salary per period, or hourly rate
+        self.periods = periods
+        self.hours = None if salary else hours  # Hours per period, hourly jobs only
+        if salary:
+            self.annual = amount * periods
+        else:
+            # Hourly rate * hours per period * number of periods
+            self.annual = amount * hours * periods
+
+    def as_tuple(self):
+        """(desc, salary, amount, periods) for salaried jobs, plus hours for hourly jobs"""
+        if self.salary:
+            return (self.desc, self.salary, self.amount, self.periods)
+        return (self.desc, self.salary, self.amount, self.periods, self.hours)
+
+
+class Item(NamedTuple):
+    """A deduction or credit"""
+    desc: str
+    amount: float
+
+
 class Payer:
     def __init__(self):
         self.jobs = []
@@ -5,35 +368,99 @@ class Payer:
         self.deduct = []
         self.rcredit = []
         self.nrcredit = []
+        self.rules = {}  # Rule name -> units (e.g. number of children)
         self.standard_deduction_added = False
+        self.year = DEFAULT_YEAR  # Tax year used when a calculation does not name one
+        self.version = 0  # Increases on every mutation
+
+        # Running totals, kept up to date as items are added and removed
+        self.gross_income = 0.0
+        self.deduct_total = 0.0
+        self.rcredit_total = 0.0
+        self.nrcredit_total = 0.0
+        # The same totals in integer cents for the exact engine; these never drift
+        self.gross_cents = 0
+        self.deduct_cents = 0
+        self.rcredit_cents = 0
+        self.nrcredit_cents = 0
+        self._result = None  # (generation, year, exact, result) of the last calculate(), cleared on mutation
+        self.on_change = None  # Optional callback, called with the payer after every mutation
+
+    def _changed(self):
+        self.version += 1
+        self._result = None
+        if self.on_change is not None:
+            self.on_change(self)
+
+    def to_dict(self):
+        """JSON-serializable snapshot of the payer's inputs"""
+        return {
+            'status': self.status,
+            'jobs': [job.as_tuple() for job in self.jobs],
+            'deduct': self.deduct,
+            'rcredit': self.rcredit,
+            'nrcredit': self.nrcredit,
+            'rules': self.rules,
+            'standard_deduction_added': self.standard_deduction_added,
+            'year': self.year,
+            'version': self.version
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a payer, including its running totals, from a to_dict() snapshot"""
+        payer = cls()
+        payer.status = data['status']
+        for job in data['jobs']:
+            job = Job(*job)
+            payer.jobs.append(job)
+            payer.gross_income += job.annual
+            payer.gross_cents += to_cents(job.annual)
+        for name in ('deduct', 'rcredit', 'nrcredit'):
+            items = [Item(desc, amount) for desc, amount in data[name]]
+            setattr(payer, name, items)
+            setattr(payer, f'{name}_total', sum(amount for _, amount in items) if items else 0.0)
+            setattr(payer, f'{name}_cents', sum(to_cents(amount) for _, amount in items))
+        payer.rules = dict(data.get('rules', {}))
+        payer.standard_deduction_added = data['standard_deduction_added']
+        payer.year = data.get('year', DEFAULT_YEAR)  # Snapshots from before tax years were added
+        payer.version = data['version']
+        return payer
+
+    def copy(self):
+        """Independent payer with the same inputs, without the change callback"""
+        return type(self).from_dict(self.to_dict())
+
+    def commit(self, other):
+        """Take over the inputs of a copy that was changed, as one mutation"""
+        for name in ('jobs', 'status', 'deduct', 'rcredit', 'nrcredit', 'rules', 'standard_deduction_added', 'year',
+                     'gross_income', 'deduct_total', 'rcredit_total', 'nrcredit_total',
+                     'gross_cents', 'deduct_cents', 'rcredit_cents', 'nrcredit_cents'):
+            setattr(self, name, getattr(other, name))
+        self._changed()
 
     def period_to_number(self, period):
-        if period == 'A':  # Annual
-            return 1
-        elif period == 'M':  # Monthly
-            return 12
-        elif period == 'S':  # Semi-monthly
-            return 24
-        elif period == 'B':  # Bi-weekly
-            return 26
-        elif period == 'W':  # Weekly
-            return 52
-        else:  # Invalid input
-            return -1
+        # Annual, Monthly, Semi-monthly, Bi-weekly or Weekly; -1 for invalid input
+        return PERIODS.get(period, -1)
 
     def add_job(self, desc, salary, amount, period='A', hours=40):
         periods = self.period_to_number(period)
-        if salary and periods > 0:  # Salary paycheck
-            self.jobs.append((desc, salary, amount, periods))
-            return True
-        elif not salary and periods > 0:  # Hourly paycheck
-            self.jobs.append((desc, salary, amount, periods, hours))
+        if periods > 0:  # Salary or hourly paycheck
+            job = Job(desc, salary, amount, periods, hours)
+            self.jobs.append(job)
+            self.gross_income += job.annual
+            self.gross_cents += to_cents(job.annual)
+            self._changed()
             return True
         return False
 
     def remove_job(self, index):
         if 0 <= index < len(self.jobs):
-            self.jobs.pop(index)
+            job = self.jobs.pop(index)
+            # Reset to exactly zero once empty so rounding error cannot accumulate
+            self.gross_income = self.gross_income - job.annual if self.jobs else 0.0
+            self.gross_cents -= to_cents(job.annual)
+            self._changed()
             return True
         return False
 
@@ -41,166 +468,251 @@ class Payer:
         # Unmarried, Joint and married, Separate and married, or Head of household
         if status == 'U' or status == 'J' or status == 'S' or status == 'H':
             self.status = status
+            self._changed()
             return True
         return False
 
+    def set_year(self, year):
+        try:
+            get_tax_year(year)
+        except ValueError:
+            return False
+        self.year = year
+        self._changed()
+        return True
+
     def add_deduct(self, desc, amount):
         # Add a tax deduction besides the standard one
-        self.deduct.append((desc, amount))
+        self.deduct.append(Item(desc, amount))
+        self.deduct_total += amount
+        self.deduct_cents += to_cents(amount)
         # Check if this is the standard deduction
-        if desc.lower().find('standard') != -1 or amount in [15000, 22500, 30000]:
+        if desc.lower().find('standard') != -1 or amount in get_tax_year(self.year).standard_deductions.values():
             self.standard_deduction_added = True
+        self._changed()
 
     def add_rcredit(self, desc, amount):
-        self.rcredit.append((desc, amount))
+        self.rcredit.append(Item(desc, amount))
+        self.rcredit_total += amount
+        self.rcredit_cents += to_cents(amount)
+        self._changed()
 
     def add_nrcredit(self, desc, amount):
-        self.nrcredit.append((desc, amount))
+        self.nrcredit.append(Item(desc, amount))
+        self.nrcredit_total += amount
+        self.nrcredit_cents += to_cents(amount)
+        self._changed()
+
+    def add_rule(self, name, units=1):
+        """Claim a rule of the payer's tax year, e.g. add_rule('child_tax_credit', 2)"""
+        if name not in get_tax_year(self.year).rules or units <= 0:
+            return False
+        self.rules[name] = units
+        self._changed()
+        return True
+
+    def remove_rule(self, name):
+        if self.rules.pop(name, None) is None:
+            return False
+        self._changed()
+        return True
+
+    def rule_amounts(self, year=None):
+        """Totals of the claimed rules at the payer's AGI by kind; rules a year lacks add nothing"""
+        totals = dict.fromkeys(RULE_KINDS, 0.0)
+        if self.rules:
+            rules = get_tax_year(self.year if year is None else year).rules
+            for name, units in self.rules.items():
+                rule = rules.get(name)
+                if rule is not None:
+                    totals[rule.kind] += rule.amount(self.status, self.gross_income) * units
+        return totals
 
     def remove_deduct(self, index):
         if 0 <= index < len(self.deduct):
-            self.deduct.pop(index)
+            _, amount = self.deduct.pop(index)
+            self.deduct_total = self.deduct_total - amount if self.deduct else 0.0
+            self.deduct_cents -= to_cents(amount)
+            self._changed()
             return True
         return False
 
     def remove_rcredit(self, index):
         if 0 <= index < len(self.rcredit):
-            self.rcredit.pop(index)
+            _, amount = self.rcredit.pop(index)
+            self.rcredit_total = self.rcredit_total - amount if self.rcredit else 0.0
+            self.rcredit_cents -= to_cents(amount)
+            self._changed()
             return True
         return False
 
     def remove_nrcredit(self, index):
         if 0 <= index < len(self.nrcredit):
-            self.nrcredit.pop(index)
+            _, amount = self.nrcredit.pop(index)
+            self.nrcredit_total = self.nrcredit_total - amount if self.nrcredit else 0.0
+            self.nrcredit_cents -= to_cents(amount)
+            self._changed()
             return True
         return False
 
-    def calculate_fica(self, gross_income):
+    def calculate_fica(self, gross_income, year=None):
         """Calculate FICA taxes (Social Security and Medicare)"""
-        # Social Security tax: 6.2% on first $176,100 (2025 limit)
-        social_security_limit = 176100
-        social_security_tax = min(gross_income, social_security_limit) * 0.062
+        tax_year = get_tax_year(self.year if year is None else year)
+
+        # Social Security tax: 6.2% up to the year's wage base
+        social_security_tax = min(gross_income, tax_year.social_security_limit) * tax_year.social_security_rate
         
         # Medicare tax: 1.45% on all income
-        medicare_tax = gross_income * 0.0145
+        medicare_tax = gross_income * tax_year.medicare_rate
         
         # Additional Medicare surtax: 0.9% on earnings over threshold
-        if self.status == 'U' or self.status == 'H':  # Single or Head of household
-            surtax_threshold = 200000
-        elif self.status == 'J':  # Married filing jointly
-            surtax_threshold = 250000
-        elif self.status == 'S':  # Married filing separately
-            surtax_threshold = 125000
-        else:
-            surtax_threshold = 200000  # Default to single threshold
+        surtax_threshold = tax_year.surtax_threshold(self.status)
         
         if gross_income > surtax_threshold:
-            medicare_surtax = (gross_income - surtax_threshold) * 0.009
+            medicare_surtax = (gross_income - surtax_threshold) * tax_year.medicare_surtax_rate
             medicare_tax += medicare_surtax
         
         return social_security_tax + medicare_tax
 
-    def calculate_income_tax(self, taxable_income):
-        """Calculate federal income tax using 2025 brackets"""
-        if self.status == 'U':  # Single
-            brackets = [
-                (0, 11925, 0.10),
-                (11925, 48475, 0.12),
-                (48475, 103350, 0.22),
-                (103350, 197300, 0.24),
-                (197300, 250525, 0.32),
-                (250525, 626350, 0.35),
-                (626350, float('inf'), 0.37)
-            ]
-        elif self.status == 'J':  # Married filing jointly
-            brackets = [
-                (0, 23850, 0.10),
-                (23850, 96950, 0.12),
-                (96950, 206700, 0.22),
-                (206700, 394600, 0.24),
-                (394600, 501050, 0.32),
-                (501050, 751600, 0.35),
-                (751600, float('inf'), 0.37)
-            ]
-        elif self.status == 'S':  # Married filing separately
-            brackets = [
-                (0, 11925, 0.10),
-                (11925, 48475, 0.12),
-                (48475, 103350, 0.22),
-                (103350, 197300, 0.24),
-                (197300, 250525, 0.32),
-                (250525, 375800, 0.35),
-                (375800, float('inf'), 0.37)
-            ]
-        elif self.status == 'H':  # Head of household
-            brackets = [
-                (0, 17000, 0.10),
-                (17000, 64850, 0.12),
-                (64850, 103350, 0.22),
-                (103350, 197300, 0.24),
-                (197300, 250500, 0.32),
-                (250500, 626350, 0.35),
-                (626350, float('inf'), 0.37)
-            ]
-        else:
+    def calculate_income_tax(self, taxable_income, year=None):
+        """Calculate federal income tax using the brackets of the payer's tax year"""
+        table = tax_table(self.year if year is None else year, self.status)
+        if table is None:
             return 0
 
-        tax = 0
-        for i, (lower, upper, rate) in enumerate(brackets):
-            if taxable_income > lower:
-                if i == len(brackets) - 1:  # Top bracket
-                    tax += (taxable_income - lower) * rate
-                else:
-                    bracket_income = min(taxable_income, upper) - lower
-                    tax += bracket_income * rate
-
-        return tax
-
-    def calculate(self):
-        """Calculate total tax burden"""
-        # Calculate gross income
-        gross_income = 0.0
-        for job in self.jobs:
-            if len(job) == 4:  # Salaried job: (desc, salary, amount, periods)
-                desc, salary, amount, periods = job
-                if salary:  # Salaried job
-                    gross_income += amount * periods
-            elif len(job) == 5:  # Hourly job: (desc, salary, amount, periods, hours)
-                desc, salary, amount, periods, hours = job
-                if not salary:  # Hourly job
-                    # Calculate annual income: hourly rate * hours per period * number of periods
-                    gross_income += amount * hours * periods  # amount is hourly rate, hours per period, periods per year
+        # Highest bracket whose lower threshold is below the taxable income
+        i = bisect_left(table.lowers, taxable_income) - 1
+        if i < 0:
+            return 0
+        return table.base_tax[i] + (taxable_income - table.lowers[i]) * table.rates[i]
+
+    def calculate_fica_cents(self, gross_cents, year=None):
+        """calculate_fica in integer cents, with the total rounded half up to a cent once"""
+        return _fica_cents(get_tax_year(self.year if year is None else year), self.status, gross_cents)
+
+    def calculate_income_tax_cents(self, taxable_cents, year=None):
+        """calculate_income_tax in integer cents, rounded half up to a cent"""
+        return _income_tax_cents(get_tax_year(self.year if year is None else year), self.status, taxable_cents)
+
+    def calculate(self, year=None, exact=False):
+        """Calculate total tax burden for a tax year (default: the payer's own).
+
+        With exact=True the integer-cents engine is used: amounts are rounded to cents,
+        FICA and income tax are each rounded half up to a cent, and the results are
+        whole cents.
+        """
+        if year is None:
+            year = self.year
+        # Repeated calls between mutations are served from the cached result
+        cached = self._result
+        if cached is not None and cached[:3] == (_CACHE_GENERATION, year, exact):
+            return dict(cached[3])
+
+        # Then from the result of any other payer with the same inputs
+        key = self.inputs_key(year, exact)
+        result = RESULT_CACHE.get(key)
+        if result is None:
+            if exact:
+                result = {name: cents / 100 for name, cents in self._calculate_cents(year).items()}
+            else:
+                result = self._calculate(year)
+            RESULT_CACHE.put(key, result)
+        self._result = (_CACHE_GENERATION, year, exact, result)
+        return dict(result)
+
+    def inputs_key(self, year=None, exact=False):
+        """Canonical key of everything calculate() depends on.
+
+        Jobs are normalized to their annualized total and deductions and credits to
+        their sums, so households that differ only in descriptions match.
+        """
+        if year is None:
+            year = self.year
+        rules = tuple(sorted(self.rules.items()))
+        if exact:
+            return ('cents', year, self.status, self.gross_cents, self.deduct_cents, self.nrcredit_cents,
+                    self.rcredit_cents, rules)
+        return (year, self.status, self.gross_income, self.deduct_total, self.nrcredit_total, self.rcredit_total,
+                rules)
+
+    def _calculate_cents(self, year=None):
+        """_calculate in integer cents from the cent running totals.
+
+        Inlines _fica_cents and _income_tax_cents with one tax year lookup, so the exact
+        engine is no slower than the float one; tests/test_batch.py checks that both
+        stay in step with calculate_fica_cents and calculate_income_tax_cents.
+        """
+        tax_year = get_tax_year(self.year if year is None else year)
+        status = self.status
+        half = RATE_SCALE // 2
+        gross_cents = self.gross_cents
+
+        thresholds = tax_year.surtax_thresholds_cents
+        surtax_threshold = thresholds.get(status, thresholds['U'])
+        fica_tax = (min(gross_cents, tax_year.social_security_limit_cents) * tax_year.social_security_points
+                    + gross_cents * tax_year.medicare_points)
+        if gross_cents > surtax_threshold:
+            fica_tax += (gross_cents - surtax_threshold) * tax_year.medicare_surtax_points
+        fica_tax = (fica_tax + half) // RATE_SCALE
+
+        standard_deductions = tax_year.standard_deductions_cents
+        standard_deduction = standard_deductions.get(status, standard_deductions['U'])
+        # Claimed rules, each evaluated at AGI and rounded to cents
+        extra = dict.fromkeys(RULE_KINDS, 0)
+        if self.rules:
+            agi = gross_cents / 100
+            for name, units in self.rules.items():
+                rule = tax_year.rules.get(name)
+                if rule is not None:
+                    extra[rule.kind] += _round_cents(rule.amount(status, agi) * units)
+        taxable_income = max(gross_cents - standard_deduction - self.deduct_cents - extra['deduct'], 0)
+
+        income_tax = 0
+        table = tax_year.cent_tables.get(status)
+        if table is not None:
+            i = bisect_left(table.lowers, taxable_income) - 1
+            if i >= 0:
+                income_tax = table.base_tax[i] + ((taxable_income - table.lowers[i]) * table.rates[i] + half) // RATE_SCALE
+        income_tax = max(income_tax - self.nrcredit_cents - extra['nrcredit'], 0)
+        refundable_credits = self.rcredit_cents + extra['rcredit']
+        return {
+            'gross_income': gross_cents,
+            'taxable_income': taxable_income,
+            'fica_tax': fica_tax,
+            'income_tax': income_tax,
+            'refundable_credits': refundable_credits,
+            'total_tax': fica_tax + income_tax - refundable_credits
+        }
+
+    def _calculate(self, year=None):
+        """Calculate total tax burden from the running totals, bypassing the caches"""
+        # Gross income is kept as a running total of the annualized jobs
+        gross_income = self.gross_income
 
         # Calculate FICA taxes
-        fica_tax = self.calculate_fica(gross_income)
+        fica_tax = self.calculate_fica(gross_income, year)
 
         # Calculate taxable income
-        if self.status == 'J':
-            standard_deduction = 30000
-        elif self.status == 'H':
-            standard_deduction = 22500
-        elif self.status == 'S':
-            standard_deduction = 15000
-        else:  # Single
-            standard_deduction = 15000
+        standard_deduction = get_tax_year(self.year if year is None else year).standard_deduction(self.status)
 
         taxable_income = gross_income - standard_deduction
-        
+
+        # Phase-out rules are evaluated at AGI, which is the gross income here
+        rule_amounts = self.rule_amounts(year)
+
         # Subtract additional deductions
-        for _, amount in self.deduct:
-            taxable_income -= amount
+        taxable_income -= self.deduct_total + rule_amounts['deduct']
         
         taxable_income = max(taxable_income, 0.0)
 
         # Calculate income tax
-        income_tax = self.calculate_income_tax(taxable_income)
+        income_tax = self.calculate_income_tax(taxable_income, year)
 
-        # Apply non-refundable credits
-        for _, amount in self.nrcredit:
-            income_tax = max(income_tax - amount, 0)
+        # Apply non-refundable credits; they can reduce the tax to zero but not below
+        income_tax = max(income_tax - (self.nrcredit_total + rule_amounts['nrcredit']), 0)
 
         # Apply refundable credits
-        refundable_credit_total = sum(amount for _, amount in self.rcredit)
+        refundable_credit_total = self.rcredit_total + rule_amounts['rcredit']
 
         # Calculate total tax burden
         total_tax = fica_tax + income_tax - refundable_credit_total
@@ -222,14 +734,10 @@ class Payer:
         
         print("\nCurrent Jobs:")
         for i, job in enumerate(self.jobs):
-            if len(job) == 4:  # Salaried job: (desc, salary, amount, periods)
-                desc, salary, amount, periods = job
-                if salary:
-                    print(f"{i}: {desc} - ${amount:,.2f} ({periods} periods)")
-            elif len(job) == 5:  # Hourly job: (desc, salary, amount, periods, hours)
-                desc, salary, amount, periods, hours = job
-                if not salary:
-                    print(f"{i}: {desc} - ${amount:.2f}/hour ({hours} hours)")
+            if job.salary:
+                print(f"{i}: {job.desc} - ${job.amount:,.2f} ({job.periods} periods)")
+            else:
+                print(f"{i}: {job.desc} - ${job.amount:.2f}/hour ({job.hours} hours)")
 
     def display_deductions(self):
         """Display all deductions with indices"""
@@ -255,9 +763,369 @@ class Payer:
             print(f"{i}: {desc} - ${amount:,.2f}")
 
 
+def _status_codes(status):
+    """Map an array of filing status letters to batch engine codes"""
+    status = np.asarray(status, dtype=object)
+    return np.fromiter((STATUS_CODES.get(s, UNSET_STATUS) for s in status.ravel()),
+                       dtype=np.intp, count=status.size).reshape(status.shape)
+
+
+def calculate_fica_batch(codes, gross_income, year=None):
+    """Vectorized Payer.calculate_fica over arrays of status codes and gross incomes"""
+    tax_year = get_tax_year(year)
+    social_security_tax = np.minimum(gross_income, tax_year.social_security_limit) * tax_year.social_security_rate
+    medicare_tax = gross_income * tax_year.medicare_rate
+    surtax_threshold = tax_year.surtax_threshold_array[codes]
+    medicare_tax = np.where(gross_income > surtax_threshold,
+                            medicare_tax + (gross_income - surtax_threshold) * tax_year.medicare_surtax_rate,
+                            medicare_tax)
+    return social_security_tax + medicare_tax
+
+
+def calculate_income_tax_batch(codes, taxable_income, year=None):
+    """Vectorized Payer.calculate_income_tax over arrays of status codes and taxable incomes"""
+    taxable_income = np.asarray(taxable_income, dtype=float)
+    codes = np.broadcast_to(codes, taxable_income.shape)
+    tax = np.zeros(taxable_income.shape)
+    for code, lowers, rates, base_tax in get_tax_year(year).batch_tables:
+        rows = codes == code
+        if not rows.any():
+            continue
+        income = taxable_income[rows]
+        i = np.searchsorted(lowers, income, side='left') - 1
+        clipped = np.maximum(i, 0)
+        tax[rows] = np.where(i >= 0, base_tax[clipped] + (income - lowers[clipped]) * rates[clipped], 0.0)
+    return tax
+
+
+def calculate_fica_batch_cents(codes, gross_cents, year=None):
+    """Vectorized Payer.calculate_fica_cents over int64 arrays"""
+    tax_year = get_tax_year(year)
+    fica_tax = np.minimum(gross_cents, tax_year.social_security_limit_cents) * tax_year.social_security_points
+    fica_tax += gross_cents * tax_year.medicare_points
+    fica_tax += np.maximum(gross_cents - tax_year.surtax_threshold_cents_array[codes], 0) * tax_year.medicare_surtax_points
+    return (fica_tax + RATE_SCALE // 2) // RATE_SCALE
+
+
+def calculate_income_tax_batch_cents(codes, taxable_cents, year=None):
+    """Vectorized Payer.calculate_income_tax_cents over int64 arrays.
+
+    One searchsorted over the combined table of all statuses replaces the per-status
+    masks of the float engine. Tax is continuous at the thresholds, so searching to the
+    right gives the same cents as bisect_left, and no income falls below its table.
+    """
+    keys, rates, base_tax = get_tax_year(year).batch_cent_table
+    key = np.asarray(codes, dtype=np.int64) * CENTS_KEY_SHIFT + taxable_cents
+    i = np.searchsorted(keys, key, side='right') - 1
+    return base_tax[i] + ((key - keys[i]) * rates[i] + RATE_SCALE // 2) // RATE_SCALE
+
+
+def to_cents_array(amounts):
+    """Vectorized to_cents"""
+    return np.floor(np.round(np.asarray(amounts, dtype=float) * 100, 6) + 0.5).astype(np.int64)
+
+
+def calculate_batch_cents(status, gross_cents, deductions=0, nrcredits=0, rcredits=0, year=None):
+    """calculate_batch on int64 cents: the exact engine for many taxpayers at once"""
+    tax_year = get_tax_year(year)
+    codes = _status_codes(status)
+    gross_cents = np.asarray(gross_cents, dtype=np.int64)
+    fica_tax = calculate_fica_batch_cents(codes, gross_cents, tax_year.year)
+    taxable_income = np.maximum(gross_cents - tax_year.standard_deduction_cents_array[codes]
+                                - np.asarray(deductions, dtype=np.int64), 0)
+    income_tax = calculate_income_tax_batch_cents(codes, taxable_income, tax_year.year)
+    income_tax = np.maximum(income_tax - np.asarray(nrcredits, dtype=np.int64), 0)
+    refundable_credit_total = np.broadcast_to(np.asarray(rcredits, dtype=np.int64), gross_cents.shape)
+    return {
+        'gross_income': gross_cents,
+        'taxable_income': taxable_income,
+        'fica_tax': fica_tax,
+        'income_tax': income_tax,
+        'refundable_credits': refundable_credit_total,
+        'total_tax': fica_tax + income_tax - refundable_credit_total
+    }
+
+
+def rule_amounts_batch(codes, gross_income, rules, year=None):
+    """Amounts of claimed rules by kind, each a list of per-rule arrays.
+
+    rules maps rule names to units (a scalar or one entry per row); rules the year
+    lacks add nothing.
+    """
+    tax_year = get_tax_year(year)
+    amounts = {kind: [] for kind in RULE_KINDS}
+    for name, units in dict(rules).items():
+        rule = tax_year.rules.get(name)
+        if rule is not None:
+            amounts[rule.kind].append(rule.amount_batch(codes, gross_income) * np.asarray(units, dtype=float))
+    return amounts
+
+
+def calculate_batch(status, gross_income, deductions=0.0, nrcredits=0.0, rcredits=0.0, year=None, exact=False,
+                    rules=None):
+    """Calculate total tax burden for many taxpayers at once.
+
+    Takes columnar inputs (one entry per taxpayer): filing status letters, annual gross
+    income from jobs, and the totals of their extra deductions, non-refundable credits
+    and refundable credits. Returns the same keys as Payer.calculate with array values.
+    All rows use the same tax year (default: DEFAULT_YEAR). With exact=True the inputs
+    are rounded to cents and calculated with the integer-cents engine. rules maps rule
+    names to the units claimed (see rule_amounts_batch).
+    """
+    codes = _status_codes(status)
+    if exact:
+        gross_cents = to_cents_array(gross_income)
+        # Rules see AGI in whole cents, as in Payer.calculate(exact=True)
+        amounts = rule_amounts_batch(codes, gross_cents / 100, rules, year) if rules else {}
+        columns = [to_cents_array(deductions), to_cents_array(nrcredits), to_cents_array(rcredits)]
+        for i, kind in enumerate(RULE_KINDS):
+            for values in amounts.get(kind, ()):
+                columns[i] = columns[i] + np.floor(values * 100 + 0.5).astype(np.int64)  # As _round_cents
+        result = calculate_batch_cents(status, gross_cents, *columns, year)
+        return {name: cents / 100 for name, cents in result.items()}
+    tax_year = get_tax_year(year)
+    gross_income = np.asarray(gross_income, dtype=float)
+    amounts = rule_amounts_batch(codes, gross_income, rules, year) if rules else {}
+    deductions = np.asarray(deductions, dtype=float) + sum(amounts.get('deduct', ()))
+    nrcredits = np.asarray(nrcredits, dtype=float) + sum(amounts.get('nrcredit', ()))
+    rcredits = np.asarray(rcredits, dtype=float) + sum(amounts.get('rcredit', ()))
+
+    fica_tax = calculate_fica_batch(codes, gross_income, tax_year.year)
+
+    taxable_income = gross_income - tax_year.standard_deduction_array[codes]
+    taxable_income = np.maximum(taxable_income - deductions, 0.0)
+
+    income_tax = calculate_income_tax_batch(codes, taxable_income, tax_year.year)
+    income_tax = np.maximum(income_tax - nrcredits, 0)
+
+    refundable_credit_total = np.broadcast_to(rcredits, gross_income.shape)
+    total_tax = fica_tax + income_tax - refundable_credit_total
+
+    return {
+        'gross_income': gross_income,
+        'taxable_income': taxable_income,
+        'fica_tax': fica_tax,
+        'income_tax': income_tax,
+        'refundable_credits': refundable_credit_total,
+        'total_tax': total_tax
+    }
+
+
+# Filing statuses a married couple can claim
+MARRIED_STATUSES = ('J', 'S')
+
+
+def compare_filing_statuses(first, second, statuses=MARRIED_STATUSES, year=None, exact=False):
+    """Total tax of a couple under each filing status, cheapest first.
+
+    'J' is one joint return on both spouses' combined jobs, deductions and credits; any
+    other status is two returns, each spouse filing their own under that status. Claimed
+    rules are combined on the joint return and kept per spouse otherwise. Every
+    return of every status is calculated in one calculate_batch pass. 'U' and 'H' may be
+    compared for reference but are marked not eligible, since a married couple cannot
+    claim them.
+    """
+    rows = []  # (status, gross income, deductions, non-refundable credits, refundable credits)
+    names = sorted(set(first.rules) | set(second.rules))
+    units = {name: [] for name in names}  # Rule units claimed on each row
+    for status in statuses:
+        if status not in STATUS_CODES:
+            raise ValueError(f"invalid filing status: {status!r}")
+        if status == 'J':
+            rows.append(('J', first.gross_income + second.gross_income, first.deduct_total + second.deduct_total,
+                         first.nrcredit_total + second.nrcredit_total, first.rcredit_total + second.rcredit_total))
+            for name in names:
+                units[name].append(first.rules.get(name, 0) + second.rules.get(name, 0))
+        else:
+            for spouse in (first, second):
+                rows.append((status, spouse.gross_income, spouse.deduct_total, spouse.nrcredit_total,
+                             spouse.rcredit_total))
+                for name in names:
+                    units[name].append(spouse.rules.get(name, 0))
+    if not rows:
+        return []
+    result = calculate_batch(*zip(*rows), year=year, exact=exact, rules=units)
+    columns = {field: result[field].tolist() for field in RESULT_FIELDS}
+
+    comparisons = []
+    row = 0
+    for status in statuses:
+        count = 1 if status == 'J' else 2
+        returns = [{field: columns[field][i] for field in RESULT_FIELDS} for i in range(row, row + count)]
+        row += count
+        comparisons.append({'status': status, 'eligible': status in MARRIED_STATUSES,
+                            'total_tax': sum(r['total_tax'] for r in returns), 'returns': returns})
+    comparisons.sort(key=lambda comparison: comparison['total_tax'])
+    return comparisons
+
+
+@lru_cache(maxsize=256)
+def tax_curve(status, deductions, nrcredits, rcredits, start, stop, steps, year=None, rules=()):
+    """Total tax, effective rate and marginal rate over an evenly spaced gross income grid.
+
+    Runs the full calculate pipeline for one taxpayer profile in a single vectorized
+    pass. rules is a tuple of (name, units) pairs. Results are cached, so the returned
+    tuples must not be modified.
+    """
+    gross_income = np.linspace(start, stop, steps)
+    total_tax = calculate_batch(status, gross_income, deductions, nrcredits, rcredits, year, rules=rules)['total_tax']
+    # Marginal rate is the tax on one more dollar of income
+    next_dollar = calculate_batch(status, gross_income + 1.0, deductions, nrcredits, rcredits, year,
+                                  rules=rules)['total_tax']
+    marginal_rate = np.round(next_dollar - total_tax, 6)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        effective_rate = np.where(gross_income > 0, total_tax / gross_income, 0.0)
+    return {
+        'gross_income': tuple(gross_income.tolist()),
+        'total_tax': tuple(total_tax.tolist()),
+        'effective_rate': tuple(effective_rate.tolist()),
+        'marginal_rate': tuple(marginal_rate.tolist())
+    }
+
+
+# Clear functions of caches defined outside this module that depend on the tax tables
+_CACHE_CLEARERS = []
+
+
+def register_cache(clear):
+    """Have invalidate_caches() also call clear()"""
+    _CACHE_CLEARERS.append(clear)
+    return clear
+
+
+def invalidate_caches():
+    """Drop every memoized result; call after changing any tax table"""
+    global _CACHE_GENERATION
+    _CACHE_GENERATION += 1
+    RESULT_CACHE.clear()
+    tax_curve.cache_clear()
+    for clear in _CACHE_CLEARERS:
+        clear()
+
+
+# Columns of a bulk input row (one household with a single job per row) and of its result
+BATCH_FIELDS = ('status', 'salary', 'amount', 'period', 'hours', 'deductions', 'nrcredits', 'rcredits')
+RESULT_FIELDS = ('gross_income', 'taxable_income', 'fica_tax', 'income_tax', 'refundable_credits', 'total_tax')
+
+
+def _parse_flag(value, default=False):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return default  # A blank cell counts as missing
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'y', 'yes', 't', 'true')
+    return bool(value)
+
+
+def _parse_amount(value, default=0.0):
+    if value is None or value == '':
+        return default
+    return float(value)
+
+
+def parse_batch_row(row):
+    """Turn a bulk input row (a mapping of BATCH_FIELDS) into calculate_batch inputs.
+
+    Returns (status, gross_income, deductions, nrcredits, rcredits) and raises
+    ValueError for an invalid filing status, pay period or amount.
+    """
+    status = str(row.get('status') or '').strip().upper()
+    if status not in STATUS_CODES:
+        raise ValueError(f"invalid filing status: {row.get('status')!r}")
+    period = str(row.get('period') or 'A').strip().upper()
+    periods = PERIODS.get(period)
+    if periods is None:
+        raise ValueError(f"invalid period: {row.get('period')!r}")
+
+    amount = _parse_amount(row.get('amount'))
+    if _parse_flag(row.get('salary'), True):
+        gross_income = amount * periods
+    else:
+        gross_income = amount * _parse_amount(row.get('hours'), 40) * periods
+    return (status, gross_income, _parse_amount(row.get('deductions')),
+            _parse_amount(row.get('nrcredits')), _parse_amount(row.get('rcredits')))
+
+
+def calculate_rows(rows, year=None):
+    """Calculate a chunk of parsed rows in one vectorized pass, returning result tuples in order"""
+    if not rows:
+        return []
+    columns = zip(*rows)
+    result = calculate_batch(*columns, year=year)
+    return list(zip(*(result[field].tolist() for field in RESULT_FIELDS)))
+
+
+def calculate_chunk(header, start, lines, year=None):
+    """Process pool task: parse, calculate and format a chunk of raw CSV lines.
+
+    Workers do all the parsing and formatting so the parent only moves text around.
+    """
+    parsed, numbers, output = [], [], {}
+    for number, values in enumerate(csv.reader(lines), start):
+        try:
+            parsed.append(parse_batch_row(dict(zip(header, values))))
+            numbers.append(number)
+        except ValueError as e:
+            output[number] = (number,) + ('',) * len(RESULT_FIELDS) + (str(e),)
+    for number, result in zip(numbers, calculate_rows(parsed, year)):
+        output[number] = (number,) + result + ('',)
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(output[number] for number in sorted(output))
+    return len(output), buffer.getvalue()
+
+
+def run_batch(input_path, output_path, workers=None, chunk_size=10000, year=None):
+    """Calculate a CSV of households (BATCH_FIELDS) in a process pool, writing results in input order"""
+    workers = workers or os.cpu_count() or 1
+    with open(input_path, newline='') as infile, open(output_path, 'w', newline='') as outfile, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        header = [name.strip() for name in next(csv.reader([infile.readline()]), [])]
+        csv.writer(outfile).writerow(('row',) + RESULT_FIELDS + ('error',))
+
+        # Keep a bounded window of chunks in flight so memory does not grow with the input
+        pending = deque()
+        start = 0
+        count = 0
+        while True:
+            raw = list(islice(infile, chunk_size))
+            lines = [line for line in raw if line.strip()]
+            if lines:
+                pending.append(pool.submit(calculate_chunk, header, start, lines, year))
+                start += len(lines)
+            if pending and (not raw or len(pending) >= 2 * workers):
+                rows, text = pending.popleft().result()
+                outfile.write(text)
+                count += rows
+            elif not raw:
+                break
+    return count
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog='main.py batch',
+                                     description='Calculate tax for every household in a CSV file.')
+    parser.add_argument('input', help=f"input CSV with columns {', '.join(BATCH_FIELDS)}")
+    parser.add_argument('output', help='output CSV path')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows per worker task')
+    parser.add_argument('--year', type=int, default=DEFAULT_YEAR, help=f'tax year (default: {DEFAULT_YEAR})')
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    try:
+        get_tax_year(args.year)
+    except ValueError as e:
+        parser.error(str(e))
+    count = run_batch(args.input, args.output, args.workers, args.chunk_size, args.year)
+    print(f"Calculated {count:,} rows into {args.output}")
+    return 0
+
+
 def main():
     print("Welcome to the U.S. Federal Personal Income Tax Calculator!")
-    print("This calculator uses 2025 tax brackets and rates.")
+    print(f"This calculator uses {DEFAULT_YEAR} tax brackets and rates.")
     
     payer = Payer()
     
@@ -337,15 +1205,7 @@ def main():
                     add_standard = input("Would you like to add the standard deduction now? (y/n): ").strip().lower()
                     if add_standard == 'y':
                         desc = "Standard Deduction"
-                        # Standard deduction amounts for 2025
-                        if payer.status == 'J':  # Married filing jointly
-                            amount = 30000
-                        elif payer.status == 'H':  # Head of household
-                            amount = 22500
-                        elif payer.status == 'S':  # Married filing separately
-                            amount = 15000
-                        else:  # Single
-                            amount = 15000
+                        amount = get_tax_year(payer.year).standard_deduction(payer.status)
                         payer.add_deduct(desc, amount)
                         print(f"Standard deduction of ${amount:,.2f} added automatically.")
                         continue
@@ -467,14 +1327,10 @@ def main():
                 if payer.jobs:
                     print(f"\nJobs ({len(payer.jobs)}):")
                     for i, job in enumerate(payer.jobs):
-                        if len(job) == 4:  # Salaried job: (desc, salary, amount, periods)
-                            desc, salary, amount, periods = job
-                            if salary:
-                                print(f"  {i+1}. {desc} - ${amount:,.2f} ({periods} periods)")
-                        elif len(job) == 5:  # Hourly job: (desc, salary, amount, periods, hours)
-                            desc, salary, amount, periods, hours = job
-                            if not salary:
-                                print(f"  {i+1}. {desc} - ${amount:.2f}/hour ({hours} hours, {periods} periods)")
+                        if job.salary:
+                            print(f"  {i+1}. {job.desc} - ${job.amount:,.2f} ({job.periods} periods)")
+                        else:
+                            print(f"  {i+1}. {job.desc} - ${job.amount:.2f}/hour ({job.hours} hours, {job.periods} periods)")
                 else:
                     print("\nJobs: None added")
                 
@@ -548,4 +1404,6 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':  # Non-interactive batch mode
+        sys.exit(batch_main(sys.argv[2:]))
     main()
@@ -0,0 +1,169 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Latency buckets in seconds, from 100us to 10s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}  # label values -> count
+
+    def inc(self, labels=(), amount=1):
+        # Single-threaded event loop and the GIL make this safe without a lock
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, labels)} {value}'
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by label values.
+
+    Each label combination owns a preallocated list of per-bucket counts, so an
+    observation is one bisect and two increments.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value, labels=()):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram, labels=()):
+    """Decorator recording the wall time of every call in a histogram"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, labels)
+        return wrapper
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latencies and in-flight requests.
+
+    Requests are labelled by their route template (e.g. "/calculate") rather than the
+    raw path, so unknown paths cannot blow up the number of series.
+    """
+
+    def __init__(self, app, requests, latency, in_flight):
+        self.app = app
+        self.requests = requests
+        self.latency = latency
+        self.in_flight = in_flight
+        self.route_paths = {}  # endpoint -> route template, filled lazily
+
+    def route_label(self, scope):
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return 'unmatched'
+        path = self.route_paths.get(endpoint)
+        if path is None:
+            for route in scope['app'].routes:
+                if getattr(route, 'endpoint', None) is endpoint:
+                    path = route.path
+                    break
+            else:
+                path = 'unmatched'
+            self.route_paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        self.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight.dec()
+            route = self.route_label(scope)
+            self.latency.observe(elapsed, (scope['method'], route))
+            self.requests.inc((scope['method'], route, status))
@@ -0,0 +1,108 @@
+"""Per-paycheck withholding schedules.
+
+Each job is paid in equal paychecks (its number of pay periods per year). Every employer
+withholds FICA on its own year-to-date wages, so Social Security stops once that job's
+wages reach the wage base and Additional Medicare withholding starts once they pass the
+year's fixed withholding threshold ($200,000), whatever the filing status. FICA withheld
+can therefore differ from the FICA that calculate() reports; the difference is settled
+at filing. Income tax is withheld as an even share of the payer's annual liability,
+split across jobs by wages, so a full year of paychecks withholds exactly the income tax
+that calculate() reports.
+"""
+import heapq
+from typing import NamedTuple
+
+import numpy as np
+
+from main import calculate_batch, get_tax_year
+
+PAYCHECK_FIELDS = ('gross_pay', 'social_security', 'medicare', 'income_tax', 'net_pay', 'ytd_gross')
+
+
+class Paycheck(NamedTuple):
+    job: int            # Index of the job in Payer.jobs
+    period: int         # Paycheck number within the year, from 1
+    gross_pay: float
+    social_security: float
+    medicare: float     # Including the additional Medicare surtax
+    income_tax: float
+    net_pay: float
+    ytd_gross: float    # This job's wages so far this year, including this paycheck
+
+
+def _fica_withholding(ytd_before, ytd_after, tax_year):
+    """Social Security and Medicare withheld on the wages between two year-to-date totals"""
+    base = tax_year.social_security_limit
+    surtax_threshold = tax_year.surtax_withholding_threshold
+    social_security = (min(ytd_after, base) - min(ytd_before, base)) * tax_year.social_security_rate
+    medicare = (ytd_after - ytd_before) * tax_year.medicare_rate
+    medicare += (max(ytd_after, surtax_threshold) - max(ytd_before, surtax_threshold)) * tax_year.medicare_surtax_rate
+    return social_security, medicare
+
+
+def job_paychecks(index, job, income_tax, year=None):
+    """Lazily yield the paychecks of one job, given its share of the annual income tax"""
+    tax_year = get_tax_year(year)
+    gross_pay = job.annual / job.periods
+    income_tax_per_check = income_tax / job.periods
+    ytd = 0.0
+    for period in range(1, job.periods + 1):
+        social_security, medicare = _fica_withholding(ytd, ytd + gross_pay, tax_year)
+        ytd += gross_pay
+        net_pay = gross_pay - social_security - medicare - income_tax_per_check
+        yield Paycheck(index, period, gross_pay, social_security, medicare, income_tax_per_check, net_pay, ytd)
+
+
+def paycheck_schedule(payer, year=None):
+    """Lazily yield every paycheck of every job of a payer in pay date order.
+
+    Paycheck k of a job paid n times a year falls at k/n of the year; paychecks on the
+    same date come in job order.
+    """
+    if year is None:
+        year = payer.year
+    income_tax = payer.calculate(year)['income_tax']
+    schedules = []
+    for index, job in enumerate(payer.jobs):
+        share = income_tax * job.annual / payer.gross_income if payer.gross_income else 0.0
+        schedules.append(job_paychecks(index, job, share, year))
+    return heapq.merge(*schedules, key=lambda paycheck: (paycheck.period / payer.jobs[paycheck.job].periods,
+                                                         paycheck.job))
+
+
+def paycheck_schedule_batch(status, pay, periods, deductions=0.0, nrcredits=0.0, year=None):
+    """Vectorized withholding for a population with one job each, streamed per pay period.
+
+    Takes columnar inputs (one entry per employee): filing status letters, gross pay per
+    paycheck, paychecks per year and the totals of extra deductions and non-refundable
+    credits. Yields (period, {field: array}) for periods 1 to max(periods), with PAYCHECK_FIELDS
+    as keys; employees with fewer paychecks get zeros once their year is over. Memory stays
+    proportional to the population, not to population x periods.
+    """
+    tax_year = get_tax_year(year)
+    pay = np.asarray(pay, dtype=float)
+    periods = np.broadcast_to(np.asarray(periods, dtype=np.intp), pay.shape)
+    income_tax = calculate_batch(status, pay * periods, deductions, nrcredits, year=tax_year.year)['income_tax']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        income_tax_per_check = np.where(periods > 0, income_tax / periods, 0.0)
+    surtax_threshold = tax_year.surtax_withholding_threshold
+    base = tax_year.social_security_limit
+
+    ytd = np.zeros(pay.shape)
+    for period in range(1, int(periods.max(initial=0)) + 1):
+        paid = periods >= period
+        gross_pay = np.where(paid, pay, 0.0)
+        ytd_after = ytd + gross_pay
+        social_security = (np.minimum(ytd_after, base) - np.minimum(ytd, base)) * tax_year.social_security_rate
+        medicare = gross_pay * tax_year.medicare_rate + (
+            np.maximum(ytd_after, surtax_threshold) - np.maximum(ytd, surtax_threshold)) * tax_year.medicare_surtax_rate
+        withheld = np.where(paid, income_tax_per_check, 0.0)
+        ytd = ytd_after
+        yield period, {
+            'gross_pay': gross_pay,
+            'social_security': social_security,
+            'medicare': medicare,
+            'income_tax': withheld,
+            'net_pay': gross_pay - social_security - medicare - withheld,
+            'ytd_gross': ytd
+        }
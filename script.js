@@ -53,42 +53,29 @@ class TaxCalculator {
     // Load current state from API
     async loadStateFromAPI() {
         try {
-            // Load filing status
-            const statusResult = await this.apiCall('/get_filing_status');
-            this.filingStatus = statusResult.status;
-            
-            // Load jobs
-            const jobsResult = await this.apiCall('/get_jobs');
-            this.jobs = jobsResult.jobs;
-            
-            // Load deductions
-            const deductionsResult = await this.apiCall('/get_deductions');
-            this.deductions = deductionsResult.deductions;
-            
-            // Load refundable credits
-            const rcreditsResult = await this.apiCall('/get_refundable_credits');
-            this.refundableCredits = rcreditsResult.refundable_credits;
-            
-            // Load non-refundable credits
-            const nrcreditsResult = await this.apiCall('/get_non_refundable_credits');
-            this.nonRefundableCredits = nrcreditsResult.non_refundable_credits;
-            
-            // Load standard deduction status
-            const standardResult = await this.apiCall('/get_standard_deduction_added');
-            this.standardDeductionAdded = standardResult.standard_deduction_added;
-            
-            this.updateDisplay();
+            const state = await this.apiCall('/state');
+            this.applyState(state);
         } catch (error) {
             console.error('Failed to load state from API:', error);
         }
     }
 
+    // Apply a full state snapshot returned by /state or a mutating endpoint
+    applyState(state) {
+        this.filingStatus = state.status;
+        this.jobs = state.jobs;
+        this.deductions = state.deductions;
+        this.refundableCredits = state.refundable_credits;
+        this.nonRefundableCredits = state.non_refundable_credits;
+        this.standardDeductionAdded = state.standard_deduction_added;
+        this.updateDisplay();
+    }
+
     // Set filing status
     async setFilingStatus(status) {
         try {
-            await this.apiCall('/set_status', 'POST', { status });
-            this.filingStatus = status;
-            this.updateDisplay();
+            const result = await this.apiCall('/set_status', 'POST', { status });
+            this.applyState(result.state);
         } catch (error) {
             this.showMessage('Failed to set filing status: ' + error.message, 'error');
         }
@@ -114,10 +101,7 @@ class TaxCalculator {
             });
             
             if (result.success) {
-                // Reload jobs from API
-                const jobsResult = await this.apiCall('/get_jobs');
-                this.jobs = jobsResult.jobs;
-                this.updateDisplay();
+                this.applyState(result.state);
             }
         } catch (error) {
             throw new Error('Failed to add job: ' + error.message);
@@ -127,12 +111,8 @@ class TaxCalculator {
     // Remove job
     async removeJob(index) {
         try {
-            await this.apiCall('/remove_job', 'POST', { index });
-            
-            // Reload jobs from API
-            const jobsResult = await this.apiCall('/get_jobs');
-            this.jobs = jobsResult.jobs;
-            this.updateDisplay();
+            const result = await this.apiCall('/remove_job', 'POST', { index });
+            this.applyState(result.state);
         } catch (error) {
             this.showMessage('Failed to remove job: ' + error.message, 'error');
         }
@@ -141,22 +121,11 @@ class TaxCalculator {
     // Add deduction
     async addDeduction(description, amount) {
         try {
-            await this.apiCall('/add_deduct', 'POST', {
+            const result = await this.apiCall('/add_deduct', 'POST', {
                 desc: description,
                 amount: parseFloat(amount)
             });
-            
-            // Reload deductions from API
-            const deductionsResult = await this.apiCall('/get_deductions');
-            this.deductions = deductionsResult.deductions;
-            
-            // Check if this is the standard deduction
-            if (description.toLowerCase().includes('standard') || 
-                [15000, 22500, 30000].includes(parseFloat(amount))) {
-                this.standardDeductionAdded = true;
-            }
-            
-            this.updateDisplay();
+            this.applyState(result.state);
         } catch (error) {
             throw new Error('Failed to add deduction: ' + error.message);
         }
@@ -165,12 +134,8 @@ class TaxCalculator {
     // Remove deduction
     async removeDeduction(index) {
         try {
-            await this.apiCall('/remove_deduct', 'POST', { index });
-            
-            // Reload deductions from API
-            const deductionsResult = await this.apiCall('/get_deductions');
-            this.deductions = deductionsResult.deductions;
-            this.updateDisplay();
+            const result = await this.apiCall('/remove_deduct', 'POST', { index });
+            this.applyState(result.state);
         } catch (error) {
             this.showMessage('Failed to remove deduction: ' + error.message, 'error');
         }
@@ -179,15 +144,11 @@ class TaxCalculator {
     // Add refundable credit
     async addRefundableCredit(description, amount) {
         try {
-            await this.apiCall('/add_rcredit', 'POST', {
+            const result = await this.apiCall('/add_rcredit', 'POST', {
                 desc: description,
                 amount: parseFloat(amount)
             });
-            
-            // Reload refundable credits from API
-            const rcreditsResult = await this.apiCall('/get_refundable_credits');
-            this.refundableCredits = rcreditsResult.refundable_credits;
-            this.updateDisplay();
+            this.applyState(result.state);
         } catch (error) {
             throw new Error('Failed to add refundable credit: ' + error.message);
         }
@@ -196,12 +157,8 @@ class TaxCalculator {
     // Remove refundable credit
     async removeRefundableCredit(index) {
         try {
-            await this.apiCall('/remove_rcredit', 'POST', { index });
-            
-            // Reload refundable credits from API
-            const rcreditsResult = await this.apiCall('/get_refundable_credits');
-            this.refundableCredits = rcreditsResult.refundable_credits;
-            this.updateDisplay();
+            const result = await this.apiCall('/remove_rcredit', 'POST', { index });
+            this.applyState(result.state);
         } catch (error) {
             this.showMessage('Failed to remove refundable credit: ' + error.message, 'error');
         }
@@ -210,15 +167,11 @@ class TaxCalculator {
     // Add non-refundable credit
     async addNonRefundableCredit(description, amount) {
         try {
-            await this.apiCall('/add_nrcredit', 'POST', {
+            const result = await this.apiCall('/add_nrcredit', 'POST', {
                 desc: description,
                 amount: parseFloat(amount)
             });
-            
-            // Reload non-refundable credits from API
-            const nrcreditsResult = await this.apiCall('/get_non_refundable_credits');
-            this.nonRefundableCredits = nrcreditsResult.non_refundable_credits;
-            this.updateDisplay();
+            this.applyState(result.state);
         } catch (error) {
             throw new Error('Failed to add non-refundable credit: ' + error.message);
         }
@@ -227,12 +180,8 @@ class TaxCalculator {
     // Remove non-refundable credit
     async removeNonRefundableCredit(index) {
         try {
-            await this.apiCall('/remove_nrcredit', 'POST', { index });
-            
-            // Reload non-refundable credits from API
-            const nrcreditsResult = await this.apiCall('/get_non_refundable_credits');
-            this.nonRefundableCredits = nrcreditsResult.non_refundable_credits;
-            this.updateDisplay();
+            const result = await this.apiCall('/remove_nrcredit', 'POST', { index });
+            this.applyState(result.state);
         } catch (error) {
             this.showMessage('Failed to remove non-refundable credit: ' + error.message, 'error');
         }
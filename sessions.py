@@ -0,0 +1,109 @@
+import secrets
+import time
+from collections import OrderedDict
+
+from main import Payer
+
+
+class SessionStore:
+    """Session-keyed Payer instances with LRU eviction and an idle TTL.
+
+    Sessions are kept in least-recently-used order, so both the LRU victim and the
+    longest-idle session are always at the front and every operation is O(1).
+
+    With a database, every change is persisted and a session that is not in memory
+    (evicted, expired or from before a restart) is rehydrated on first access.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=3600, clock=time.monotonic, payer_factory=Payer, database=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.clock = clock
+        self.payer_factory = payer_factory
+        self.database = database
+        self.sessions = OrderedDict()  # session id -> (payer, last access time)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rehydrations = 0
+
+    @staticmethod
+    def new_id():
+        return secrets.token_urlsafe(16)
+
+    def get(self, session_id):
+        """Return the payer for a session, creating a fresh one on a miss"""
+        now = self.clock()
+        self.expire(now)
+        entry = self.sessions.get(session_id)
+        if entry is not None:
+            self.hits += 1
+            payer = entry[0]
+            self.sessions[session_id] = (payer, now)
+            self.sessions.move_to_end(session_id)
+            return payer
+
+        self.misses += 1
+        payer = self.load(session_id)
+        self.sessions[session_id] = (payer, now)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evictions += 1
+        return payer
+
+    def load(self, session_id):
+        """Rehydrate a session from the database, or start a fresh one"""
+        if self.database is None:
+            return self.payer_factory()
+        data = self.database.load(session_id)
+        if data is None:
+            payer = self.payer_factory()
+        else:
+            payer = self.payer_factory.from_dict(data)
+            self.rehydrations += 1
+        payer.on_change = lambda payer: self.database.save(session_id, payer)
+        return payer
+
+    def sync(self, session_id, data):
+        """Return the payer for a session, replacing it if data is a newer snapshot from elsewhere"""
+        payer = self.get(session_id)
+        if data is None or data['version'] == payer.version:
+            return payer
+        payer = self.payer_factory.from_dict(data)
+        if self.database is not None:
+            payer.on_change = lambda payer: self.database.save(session_id, payer)
+        self.sessions[session_id] = (payer, self.clock())
+        return payer
+
+    def expire(self, now=None):
+        """Drop sessions that have been idle longer than the TTL"""
+        if now is None:
+            now = self.clock()
+        while self.sessions:
+            session_id, (_, last_access) = next(iter(self.sessions.items()))
+            if now - last_access < self.ttl:
+                break
+            del self.sessions[session_id]
+            self.expirations += 1
+
+    def remove(self, session_id):
+        return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def stats(self):
+        return {
+            'sessions': len(self.sessions),
+            'max_sessions': self.max_sessions,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'rehydrations': self.rehydrations
+        }
@@ -0,0 +1,177 @@
+"""Monte Carlo simulation of a household's tax under uncertain income.
+
+Each job's inputs can be a fixed number or a distribution:
+    {"dist": "normal", "mean": 40, "sd": 5}
+    {"dist": "uniform", "low": 0, "high": 0.05}
+    {"dist": "triangular", "low": 0, "mode": 1000, "high": 5000}
+    {"dist": "lognormal", "mean": 0, "sigma": 0.25}
+
+A job spec has the same fields as Payer.add_job plus two annual adjustments:
+    {"salary": false, "amount": 32.5, "period": "B",
+     "hours": {"dist": "normal", "mean": 80, "sd": 8},   # Drawn for every paycheck
+     "raise": {"dist": "uniform", "low": 0, "high": 0.05},  # Fraction of annual pay
+     "bonus": {"dist": "triangular", "low": 0, "mode": 1000, "high": 5000}}
+
+Scenarios are drawn and calculated in vectorized chunks. Chunk i always uses the i-th
+child of SeedSequence(seed), so results depend only on the seed, the inputs and the
+chunk size, never on how many workers ran them. Chunks run on one shared process pool,
+started lazily with the forkserver (or spawn) method so that it is safe to use from a
+threaded server, and sized once so concurrent calls cannot oversubscribe the host.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from main import PERIODS, calculate_batch
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+DISTRIBUTIONS = {
+    'normal': (('mean', 'sd'), lambda rng, p, size: rng.normal(p['mean'], p['sd'], size)),
+    'uniform': (('low', 'high'), lambda rng, p, size: rng.uniform(p['low'], p['high'], size)),
+    'triangular': (('low', 'mode', 'high'), lambda rng, p, size: rng.triangular(p['low'], p['mode'], p['high'], size)),
+    'lognormal': (('mean', 'sigma'), lambda rng, p, size: rng.lognormal(p['mean'], p['sigma'], size))
+}
+
+
+def check_distribution(spec):
+    """Raise ValueError unless spec is a number or a known distribution with its parameters"""
+    if isinstance(spec, (int, float)):
+        return
+    if not isinstance(spec, dict) or spec.get('dist') not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution: {spec!r}")
+    names, _ = DISTRIBUTIONS[spec['dist']]
+    missing = [name for name in names if not isinstance(spec.get(name), (int, float))]
+    if missing:
+        raise ValueError(f"{spec['dist']} distribution needs {', '.join(missing)}")
+
+
+def check_job(job):
+    """Raise ValueError for an invalid job spec"""
+    if job.get('period', 'A') not in PERIODS:
+        raise ValueError(f"invalid period: {job.get('period')!r}")
+    for name in ('amount', 'hours', 'raise', 'bonus'):
+        if name in job:
+            check_distribution(job[name])
+    if 'amount' not in job:
+        raise ValueError("job needs an amount")
+
+
+def sample(spec, rng, size):
+    """Draw size values from a spec (a number is a constant)"""
+    if isinstance(spec, (int, float)):
+        return np.full(size, float(spec))
+    _, draw = DISTRIBUTIONS[spec['dist']]
+    return draw(rng, spec, size)
+
+
+def job_specs(payer):
+    """Fixed specs reproducing a payer's current jobs, to be edited into distributions"""
+    periods_to_code = {periods: code for code, periods in PERIODS.items()}
+    return [{'salary': job.salary, 'amount': job.amount, 'period': periods_to_code[job.periods],
+             'hours': job.hours if job.hours is not None else 0}
+            for job in payer.jobs]
+
+
+def draw_gross_income(jobs, rng, size):
+    """Annual gross income of size scenarios, summed over the jobs"""
+    gross_income = np.zeros(size)
+    for job in jobs:
+        periods = PERIODS[job.get('period', 'A')]
+        amount = np.maximum(sample(job['amount'], rng, size), 0.0)
+        if job.get('salary', True):
+            annual = amount * periods
+        else:
+            # Hours vary paycheck by paycheck; draw them all and sum per scenario
+            hours = sample(job.get('hours', 40), rng, size * periods).reshape(size, periods)
+            annual = amount * np.maximum(hours, 0.0).sum(axis=1)
+        annual *= 1.0 + sample(job.get('raise', 0), rng, size)
+        annual += sample(job.get('bonus', 0), rng, size)
+        gross_income += np.maximum(annual, 0.0)
+    return gross_income
+
+
+def simulate_chunk(seed, size, jobs, status, deductions, nrcredits, rcredits, year, rules=None):
+    """Process pool task: draw and calculate one chunk, returning (gross income, total tax)"""
+    rng = np.random.default_rng(seed)
+    gross_income = draw_gross_income(jobs, rng, size)
+    result = calculate_batch(status, gross_income, deductions, nrcredits, rcredits, year, rules=rules)
+    return gross_income, result['total_tax']
+
+
+def process_pool(workers=None):
+    """The shared simulation pool, created on first use with workers processes (default CPU count)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared pool's worker processes"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def discard_pool(pool):
+    """Drop a broken pool (a worker died) so the next process_pool call starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def simulate(jobs, status, deductions=0.0, nrcredits=0.0, rcredits=0.0, scenarios=1000000, seed=0,
+             quantiles=DEFAULT_QUANTILES, chunk_size=100000, workers=None, year=None, rules=None):
+    """Quantiles and means of gross income, total tax and net pay over random scenarios.
+
+    jobs is a list of job specs (see the module docstring); status, deductions, credits
+    and claimed phase-out rules are fixed. With workers=1, or a single chunk, everything
+    runs in this process; otherwise workers sizes the shared pool when it is first created.
+    """
+    for job in jobs:
+        check_job(job)
+    sizes = [min(chunk_size, scenarios - start) for start in range(0, scenarios, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(child, size, jobs, status, deductions, nrcredits, rcredits, year, rules)
+            for child, size in zip(seeds, sizes)]
+
+    if workers == 1 or len(args) <= 1:
+        chunks = [simulate_chunk(*arg) for arg in args]
+    else:
+        for attempt in range(2):  # Chunks are seeded, so a rerun on a fresh pool gives the same result
+            pool = process_pool(workers)
+            try:
+                chunks = list(pool.map(simulate_chunk, *zip(*args)))
+                break
+            except BrokenProcessPool:
+                discard_pool(pool)
+                if attempt:
+                    raise
+
+    gross_income = np.concatenate([chunk[0] for chunk in chunks]) if chunks else np.zeros(0)
+    total_tax = np.concatenate([chunk[1] for chunk in chunks]) if chunks else np.zeros(0)
+    columns = {'gross_income': gross_income, 'total_tax': total_tax, 'net_pay': gross_income - total_tax}
+    quantiles = [float(q) for q in quantiles]
+    return {
+        'scenarios': scenarios,
+        'seed': seed,
+        'quantiles': quantiles,
+        **{name: {'mean': float(values.mean()) if values.size else 0.0,
+                  'quantiles': np.quantile(values, quantiles).tolist() if values.size else [0.0] * len(quantiles)}
+           for name, values in columns.items()}
+    }
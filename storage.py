@@ -0,0 +1,128 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SessionDatabase:
+    """Durable payer snapshots in a local SQLite database.
+
+    Writes are write-behind: save() snapshots the session on the caller's thread and a
+    background thread writes every pending snapshot in one transaction per flush. A
+    session that changes many times between flushes is written once. A failed flush
+    keeps its snapshots pending for the next one. Reads go through a small pool of
+    connections; WAL mode lets them proceed while the writer commits.
+    """
+
+    def __init__(self, path, flush_interval=0.5, batch_size=1000, pool_size=4):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending = {}  # session id -> (version, JSON snapshot) not written yet
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.writes = 0
+        self.flushes = 0
+        self.failures = 0
+
+        self.writer = self.connect()
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+        self.writer.commit()
+
+        self.readers = queue.Queue()
+        for _ in range(pool_size):
+            self.readers.put(self.connect())
+
+        self.thread = threading.Thread(target=self.run, name="session-writer", daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")  # Durable across process crashes in WAL mode
+        return connection
+
+    def save(self, session_id, payer):
+        """Snapshot a session now; it is written on the next flush"""
+        data = payer.to_dict()
+        snapshot = (data["version"], json.dumps(data))
+        with self.lock:
+            self.pending[session_id] = snapshot
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def load(self, session_id):
+        """Snapshot of a stored session, or None"""
+        with self.lock:
+            snapshot = self.pending.get(session_id)
+        if snapshot is not None:  # Not written yet, e.g. evicted from memory before the flush
+            return json.loads(snapshot[1])
+
+        connection = self.readers.get()
+        try:
+            row = connection.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        finally:
+            self.readers.put(connection)
+        return json.loads(row[0]) if row else None
+
+    def flush(self):
+        """Write every pending snapshot in one transaction"""
+        with self.lock:
+            dirty, self.pending = self.pending, {}
+        if not dirty:
+            return 0
+        now = time.time()
+        rows = [(session_id, text, version, now) for session_id, (version, text) in dirty.items()]
+        try:
+            with self.writer:
+                self.writer.executemany(
+                    "INSERT INTO sessions (id, data, version, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET data = excluded.data, version = excluded.version, "
+                    "updated = excluded.updated",
+                    rows
+                )
+        except BaseException:
+            # Keep the batch for the next flush unless a newer snapshot was saved meanwhile
+            with self.lock:
+                for session_id, snapshot in dirty.items():
+                    newer = self.pending.get(session_id)
+                    if newer is None or newer[0] < snapshot[0]:
+                        self.pending[session_id] = snapshot
+            raise
+        self.writes += len(rows)
+        self.flushes += 1
+        return len(rows)
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.failures += 1
+                logger.exception("flushing sessions to %s failed; retrying", self.path)
+
+    def close(self):
+        """Stop the writer thread after a final flush"""
+        self.closed = True
+        self.wakeup.set()
+        self.thread.join()
+        self.flush()
+        self.writer.close()
+        while not self.readers.empty():
+            self.readers.get().close()
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+        return {"pending": pending, "writes": self.writes, "flushes": self.flushes, "failures": self.failures}
@@ -0,0 +1,59 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from backends import SessionBackend, StateServer
+
+SESSION_ID = "check-session"
+
+
+def run_worker(path, requests):
+    """One worker process: add a $1 deduction per request through the app"""
+    os.environ["TAXCALC_STATE_SOCKET"] = path
+    from app import app
+    from bench import asgi_request
+
+    async def run():
+        for i in range(requests):
+            status, _, body = await asgi_request(app, "POST", "/add_deduct", {"desc": f"{os.getpid()}-{i}", "amount": 1},
+                                                 [("X-Session-ID", SESSION_ID)])
+            if status != 200:
+                raise RuntimeError(f"add_deduct returned {status}: {body!r}")
+    asyncio.run(run())
+
+
+def start_server(path, timeout=10.0):
+    server = StateServer(path)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_until_complete, args=(server.serve(),), daemon=True).start()
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"state server did not start on {path}")
+        time.sleep(0.01)
+    return server
+
+
+def test_concurrent_workers_lose_no_updates(tmp_path):
+    workers, requests = 3, 30
+    server = start_server(str(tmp_path / "state.sock"))
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=run_worker, args=(server.path, requests)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    assert [process.exitcode for process in processes] == [0] * workers
+    data = server.sessions[SESSION_ID]
+    assert len(data["deduct"]) == data["version"] == workers * requests
+
+
+def test_session_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SessionBackend()
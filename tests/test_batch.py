@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from main import (PERIODS, RESULT_FIELDS, STATUS_CODES, Payer, available_years, calculate_batch, get_tax_year,
+                  _round_cents)
+
+RULES = ('child_tax_credit', 'other_dependent_credit', 'senior_deduction')
+
+
+def random_payer(rng):
+    payer = Payer()
+    payer.set_status(rng.choice(list(STATUS_CODES)))
+    payer.set_year(rng.choice(available_years()))
+    for i in range(rng.randint(0, 3)):
+        if rng.random() < 0.7:
+            payer.add_job(f'job {i}', True, round(rng.uniform(0, 300000), 2), 'A')
+        else:
+            payer.add_job(f'job {i}', False, round(rng.uniform(10, 90), 2), rng.choice(list(PERIODS)),
+                          rng.randint(10, 60))
+    for add in (payer.add_deduct, payer.add_nrcredit, payer.add_rcredit):
+        for i in range(rng.randint(0, 2)):
+            add(f'item {i}', round(rng.uniform(0, 8000), 2))
+    for name in RULES:
+        if rng.random() < 0.5:
+            payer.add_rule(name, rng.randint(1, 3))
+    return payer
+
+
+@pytest.mark.parametrize('exact', [False, True])
+def test_batch_matches_scalar(exact):
+    rng = random.Random(0)
+    for _ in range(3000):
+        payer = random_payer(rng)
+        expected = payer.calculate(exact=exact)
+        result = calculate_batch([payer.status], [payer.gross_income], [payer.deduct_total],
+                                 [payer.nrcredit_total], [payer.rcredit_total], year=payer.year, exact=exact,
+                                 rules={name: [units] for name, units in payer.rules.items()})
+        assert {field: float(result[field][0]) for field in RESULT_FIELDS} == expected, payer.to_dict()
+
+
+def test_exact_engine_matches_cent_methods():
+    # _calculate_cents inlines the cent methods; they must not drift apart
+    rng = random.Random(1)
+    for _ in range(3000):
+        payer = random_payer(rng)
+        result = payer._calculate_cents()
+        assert result['fica_tax'] == payer.calculate_fica_cents(payer.gross_cents)
+        nrcredits = payer.nrcredit_cents
+        for name, units in payer.rules.items():
+            rule = get_tax_year(payer.year).rules[name]
+            if rule.kind == 'nrcredit':
+                nrcredits += _round_cents(rule.amount(payer.status, payer.gross_cents / 100) * units)
+        income_tax = payer.calculate_income_tax_cents(result['taxable_income'])
+        assert result['income_tax'] == max(income_tax - nrcredits, 0)